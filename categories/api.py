@@ -0,0 +1,45 @@
+from django.db.models import F
+from django.db.models.functions import Lower
+
+from events.api import api_view, detail_payload, json_response, keyset_payload, parse_fields
+from events.autocomplete import parse_autocomplete, prefix_matches
+from events.conditional import conditional_page, tables_validator
+from events.models import Event
+from .models import Category
+
+
+CATEGORY_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'description': 'description',
+    # the denormalized counter, not a COUNT per category
+    'event_count': 'published_event_count',
+    'updated_at': 'updated_at',
+}
+
+
+# event_count moves with events, so they're part of the validator
+@conditional_page(tables_validator(Category, Event))
+@api_view
+def category_list(request):
+    fields = parse_fields(request, CATEGORY_FIELDS)
+    return json_response(keyset_payload(request, Category.objects.all(), ('name', False), fields, CATEGORY_FIELDS))
+
+
+@api_view
+def category_autocomplete(request):
+    # ?q=<prefix of the name or the slug>; slugs are lowercase already, so
+    # the unique index on slug serves the second lookup as it is
+    prefix, limit = parse_autocomplete(request)
+    categories = prefix_matches(Category.objects.all(), [Lower('name'), F('slug')], prefix, limit)
+    return json_response({'results': [
+        {'id': c.pk, 'label': c.name, 'name': c.name, 'slug': c.slug} for c in categories
+    ]})
+
+
+@conditional_page(tables_validator(Category, Event))
+@api_view
+def category_detail(request, pk):
+    fields = parse_fields(request, CATEGORY_FIELDS)
+    return json_response(detail_payload(Category.objects.all(), pk, fields, CATEGORY_FIELDS))
@@ -0,0 +1,10 @@
+# categories/api_urls.py
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path('', api.category_list, name='api_category_list'),
+    path('autocomplete/', api.category_autocomplete, name='api_category_autocomplete'),
+    path('<int:pk>/', api.category_detail, name='api_category_detail'),
+]
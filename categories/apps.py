@@ -4,3 +4,5 @@ class CategoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'categories'
 
+    def ready(self):
+        import categories.signals
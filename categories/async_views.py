@@ -0,0 +1,21 @@
+from django.shortcuts import render
+
+from events.async_views import alist
+from events.cache import acached_page_data
+from events.conditional import conditional_page, tables_validator
+from events.models import Event
+from .models import Category
+
+
+@conditional_page(tables_validator(Category, Event))
+async def category_list(request):
+    async def build():
+        categories = await alist(Category.objects.all())
+        return {
+            'categories_with_counts': [
+                {'category': cat, 'event_count': cat.published_event_count} for cat in categories
+            ],
+        }
+
+    context = await acached_page_data('category_list', ('categories', 'events'), build)
+    return render(request, 'categories/list.html', context)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from categories.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Checks Category.published_event_count against the real counts and fixes any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report categories that are out of sync, change nothing.',
+        )
+
+    def handle(self, *args, **options):
+        drifted = []
+        for cat in Category.objects.with_live_event_counts().only('pk', 'name', 'published_event_count'):
+            if cat.published_event_count != cat.live_event_count:
+                drifted.append(cat)
+                self.stdout.write(
+                    f'{cat.name}: stored {cat.published_event_count}, actual {cat.live_event_count}'
+                )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All category counts are in sync.'))
+            return
+
+        if options['check']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} category count(s) out of sync.'))
+            return
+
+        Category.objects.refresh_event_counts([cat.pk for cat in drifted])
+        self.stdout.write(self.style.SUCCESS(f'Fixed {len(drifted)} category count(s).'))
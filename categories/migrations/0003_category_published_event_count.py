@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_counts(apps, schema_editor):
+    Category = apps.get_model('categories', 'Category')
+    counted = Category.objects.annotate(n=Count('events', filter=Q(events__status='published')))
+    for cat in counted:
+        Category.objects.filter(pk=cat.pk).update(published_event_count=cat.n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_category_slug'),
+        ('events', '0003_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_event_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
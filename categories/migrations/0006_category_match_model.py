@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def fill_slugs(apps, schema_editor):
+    # rows from before the slug was set on save; the column is about to become NOT NULL
+    Category = apps.get_model('categories', 'Category')
+    taken = set(Category.objects.exclude(slug__isnull=True).exclude(slug='').values_list('slug', flat=True))
+    for cat in Category.objects.filter(models.Q(slug__isnull=True) | models.Q(slug='')):
+        slug = slugify(cat.name)[:50] or f'category-{cat.pk}'
+        if slug in taken:
+            slug = f'{slug[:40]}-{cat.pk}'
+        taken.add(slug)
+        Category.objects.filter(pk=cat.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+    # catches the schema up with models.py: created_at was dropped from the
+    # model but never from the table, so inserts that skip it fail
+
+    dependencies = [
+        ('categories', '0005_category_name_lower_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='category',
+            name='created_at',
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(blank=True, unique=True),
+        ),
+    ]
@@ -1,16 +1,53 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Lower
 from django.urls import reverse
 from django.utils.text import slugify
 
 
+class CategoryManager(models.Manager):
+
+    def with_live_event_counts(self):
+        # the slow-but-true version of published_event_count, one grouped query
+        return self.get_queryset().annotate(
+            live_event_count=Count('events', filter=models.Q(events__status='published'))
+        )
+
+    def refresh_event_counts(self, category_ids=None):
+        # recount in a single UPDATE with a correlated COUNT per category
+        through = self.model.events.through
+        published = (
+            through.objects
+            .filter(category_id=OuterRef('pk'), event__status='published')
+            .values('category_id')
+            .annotate(n=Count('pk'))
+            .values('n')
+        )
+        qs = self.get_queryset()
+        if category_ids is not None:
+            qs = qs.filter(pk__in=category_ids)
+        return qs.update(published_event_count=Coalesce(Subquery(published), 0))
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     description = models.TextField(blank=True)
+    # denormalized count of published events, kept up to date by
+    # categories/signals.py and fixable with `manage.py sync_category_counts`
+    published_event_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CategoryManager()
 
     class Meta:
         ordering = ['name']
         verbose_name_plural = 'categories'
+        indexes = [
+            models.Index(fields=['updated_at'], name='category_updated_at_idx'),
+            # prefix search for the category autocomplete
+            models.Index(Lower('name'), name='category_name_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -26,13 +63,7 @@ class Category(models.Model):
         return reverse('category_list')
 
     def get_event_count(self):
-        published_events = self.events.filter(status='published')
-        total = published_events.count()
-        return total
+        return self.published_event_count
 
     def has_any_events(self):
-        total = self.events.count()
-        if total > 0:
-            return True
-        else:
-            return False
+        return self.events.exists()
@@ -0,0 +1,85 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from events.cache import bump_generation
+from events.calendars import ALL_CALENDARS
+from events.models import ChangeLog, Event
+from .models import Category
+
+
+# everything here just works out which categories were touched and
+# recounts those, the counting itself is Category.objects.refresh_event_counts
+
+@receiver(post_save, sender=Event)
+def recount_after_event_save(sender, instance, created, **kwargs):
+    # a brand new event has no categories yet, they get added afterwards
+    # and that's handled by the m2m receiver below
+    if created:
+        return
+    category_ids = list(instance.categories.values_list('pk', flat=True))
+    if category_ids:
+        Category.objects.refresh_event_counts(category_ids)
+
+
+@receiver(pre_delete, sender=Event)
+def remember_categories_before_delete(sender, instance, **kwargs):
+    # the m2m rows are gone by the time post_delete fires
+    instance._category_ids = list(instance.categories.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Event)
+def recount_after_event_delete(sender, instance, **kwargs):
+    category_ids = getattr(instance, '_category_ids', None)
+    if category_ids:
+        Category.objects.refresh_event_counts(category_ids)
+
+
+@receiver(m2m_changed, sender=Event.categories.through)
+def recount_after_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # category.events.add(...) etc. - only this one category changed
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Category.objects.refresh_event_counts([instance.pk])
+        return
+
+    # unpublished events don't count anywhere, nothing to do
+    if instance.status != 'published':
+        return
+
+    if action == 'pre_clear':
+        instance._category_ids = list(instance.categories.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        category_ids = getattr(instance, '_category_ids', None)
+        if category_ids:
+            Category.objects.refresh_event_counts(category_ids)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        Category.objects.refresh_event_counts(pk_set)
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_pages(sender, **kwargs):
+    # category names are in the CATEGORIES of every feed's events
+    bump_generation('categories', ALL_CALENDARS)
+
+
+@receiver(post_delete, sender=Category)
+def invalidate_pages_after_category_delete(sender, **kwargs):
+    # the event <-> category links go with it
+    bump_generation('categories', 'events', ALL_CALENDARS)
+
+
+@receiver(post_save, sender=Category)
+def log_category_change(sender, instance, **kwargs):
+    ChangeLog.objects.record(ChangeLog.CATEGORY, [instance.pk])
+
+
+@receiver(pre_delete, sender=Category)
+def remember_events_before_category_delete(sender, instance, **kwargs):
+    # their links are deleted without an m2m_changed signal
+    instance._event_ids = list(instance.events.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def log_category_delete(sender, instance, **kwargs):
+    ChangeLog.objects.record(ChangeLog.CATEGORY, [instance.pk], deleted=True)
+    ChangeLog.objects.record(ChangeLog.EVENT, getattr(instance, '_event_ids', []))
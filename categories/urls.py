@@ -1,8 +1,12 @@
 # categories/urls.py
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
-    path('', views.category_list, name='category_list'),
+    path('', read_views.category_list, name='category_list'),
+    path('<slug:slug>/events.ics', views.category_calendar, name='category_calendar'),
 ]
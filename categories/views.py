@@ -1,17 +1,36 @@
 from django.shortcuts import render
+
+from events.cache import cached_page_data
+from events.calendars import calendar_events, calendar_feed
+from events.conditional import conditional_page, tables_validator
+from events.models import Event
 from .models import Category
 
 
+@conditional_page(tables_validator(Category, Event))
 def category_list(request):
-    cats = Category.objects.all()
-    cats_list = list(cats)
+    # event counts come from the denormalized counter, so a cache miss is
+    # still a single query no matter how many categories there are
+    def build():
+        result = []
+        for cat in Category.objects.all():
+            result.append({
+                'category': cat,
+                'event_count': cat.published_event_count,
+            })
+        return {'categories_with_counts': result}
+
+    # counts change with events, not just with categories
+    context = cached_page_data('category_list', ('categories', 'events'), build)
+    return render(request, 'categories/list.html', context)
+
 
-    result = []
-    for cat in cats_list:
-        count = cat.get_event_count()
-        result.append({
-            'category': cat,
-            'event_count': count,
-        })
+def category_calendar(request, slug):
+    # an .ics feed of the category's events for calendar apps to subscribe to
+    def build():
+        category = Category.objects.filter(slug=slug).values('pk', 'name').first()
+        if category is None:
+            return None
+        return calendar_events().filter(categories=category['pk']), f'LocalVibe: {category["name"]}'
 
-    return render(request, 'categories/list.html', {'categories_with_counts': result})
+    return calendar_feed(request, 'category', slug, build, f'{slug}.ics')
@@ -0,0 +1,187 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+PIN_COOKIE = 'pin_primary'
+
+# bookkeeping tables that always live on the primary and whose writes don't
+# count as "the user changed something" (the db cache backend, sessions)
+PRIMARY_ONLY_APPS = {'django_cache', 'sessions'}
+
+
+class RequestDBState:
+    """What the router needs to know about the request being served."""
+
+    __slots__ = ('pinned', 'wrote', 'replica')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        # picked on the first read and kept, so one page (and its ETag)
+        # isn't put together from replicas at different points in time
+        self.replica = None
+
+
+# a mutable object rather than flags in the var itself, so a write made
+# on a sync_to_async thread is still seen by the middleware afterwards
+current_state = ContextVar('current_db_state', default=None)
+
+
+class ReplicaHealth:
+    """
+    Remembers, per process, whether each replica answered `SELECT 1` the
+    last time it was asked. Each alias is checked at most once every
+    REPLICA_HEALTH_CHECK_INTERVAL seconds, so routing a query costs a dict
+    lookup and a clock read.
+    """
+
+    def __init__(self):
+        self.checked = {}
+        self.lock = threading.Lock()
+
+    def interval(self):
+        return getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 10)
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        found = self.checked.get(alias)
+        if found is not None and now - found[0] < self.interval():
+            return found[1]
+        with self.lock:
+            found = self.checked.get(alias)
+            if found is not None and now - found[0] < self.interval():
+                return found[1]
+            healthy = self.ping(alias)
+            self.checked[alias] = (now, healthy)
+            return healthy
+
+    def ping(self, alias):
+        conn = connections[alias]
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        except DatabaseError:
+            # don't keep a broken connection around for the next check
+            conn.close()
+            return False
+        return True
+
+    def reset(self):
+        self.checked.clear()
+
+
+health = ReplicaHealth()
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def choose_replica():
+    healthy = [alias for alias in replica_aliases() if health.is_healthy(alias)]
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to `default`. Reads made while serving a request go to a
+    healthy replica from settings.DATABASE_REPLICAS, except when:
+
+    - the client wrote something in the last REPLICA_PIN_SECONDS (see
+      ReplicaPinningMiddleware), so people see their own changes;
+    - this request already wrote something;
+    - a transaction is open on the primary, where the reads have to see it.
+
+    Outside requests (management commands, the shell) everything stays on
+    the primary. With no replicas configured this router changes nothing.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        state = current_state.get()
+        if state is None or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = choose_replica()
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from replication, not from migrate
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Tracks reads and writes per request for PrimaryReplicaRouter. A request
+    that wrote anything sets a short-lived cookie, and while it lasts that
+    client's reads go to the primary (read-your-writes).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = RequestDBState(pinned=PIN_COOKIE in request.COOKIES)
+        token = current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = RequestDBState(pinned=PIN_COOKIE in request.COOKIES)
+        if not state.pinned and replica_aliases():
+            # the health check may have to query, which the router can't do
+            # from inside the event loop, so pick the replica up front
+            state.replica = await sync_to_async(choose_replica)()
+        token = current_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_state.reset(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 15),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
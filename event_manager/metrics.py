@@ -0,0 +1,237 @@
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+from events.cache import cache_stats
+
+
+# upper bounds of the histogram buckets, Prometheus style (+Inf is implied)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+METRICS = {
+    # name -> (help text, buckets)
+    'request_duration_seconds': ('Total time spent in the view, middleware included.', SECONDS_BUCKETS),
+    'sql_duration_seconds': ('Time spent executing SQL per request.', SECONDS_BUCKETS),
+    'sql_queries': ('Number of SQL queries per request.', QUERY_BUCKETS),
+    'template_duration_seconds': ('Time spent rendering templates per request.', SECONDS_BUCKETS),
+}
+
+PREFIX = 'eventmanager_'
+WORKERS_KEY = 'metrics:workers'
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # one slot per bucket plus the +Inf overflow slot; fixed size no
+        # matter how many requests are observed
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def to_state(self):
+        return [self.counts[:], self.total, self.count]
+
+    def merge_state(self, state):
+        counts, total, count = state
+        for i, n in enumerate(counts):
+            self.counts[i] += n
+        self.total += total
+        self.count += count
+
+
+class Registry:
+    """Histograms for one process, keyed by view name then metric name."""
+
+    def __init__(self):
+        self.views = {}
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def _histograms(self, view_name):
+        histograms = self.views.get(view_name)
+        if histograms is None:
+            histograms = {name: Histogram(buckets) for name, (_, buckets) in METRICS.items()}
+            self.views[view_name] = histograms
+        return histograms
+
+    def observe(self, view_name, values):
+        with self.lock:
+            histograms = self._histograms(view_name)
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view: {name: h.to_state() for name, h in histograms.items()}
+                for view, histograms in self.views.items()
+            }
+
+    def merge_snapshot(self, snapshot):
+        for view, metrics in snapshot.items():
+            histograms = self._histograms(view)
+            for name, state in metrics.items():
+                if name in histograms:
+                    histograms[name].merge_state(state)
+
+
+registry = Registry()
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _flush_interval():
+    return getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+
+
+def flush_due():
+    return time.monotonic() - registry.last_flush >= _flush_interval()
+
+
+def flush(force=False):
+    """
+    Publish this process's histograms to the shared cache so /metrics can
+    add up every worker. Each worker only ever overwrites its own snapshot,
+    so there's nothing to lock across processes.
+    """
+    if not force and not flush_due():
+        return
+    registry.last_flush = time.monotonic()
+    cache.set(f'metrics:worker:{WORKER_ID}', registry.snapshot(), SNAPSHOT_TIMEOUT)
+    workers = cache.get(WORKERS_KEY) or []
+    if WORKER_ID not in workers:
+        # not atomic, but every flush re-registers so a lost update heals
+        cache.set(WORKERS_KEY, workers + [WORKER_ID], None)
+
+
+def collect():
+    """All workers' histograms merged into one Registry."""
+    flush(force=True)
+    workers = cache.get(WORKERS_KEY) or []
+    snapshots = cache.get_many([f'metrics:worker:{w}' for w in workers])
+    alive = [w for w in workers if f'metrics:worker:{w}' in snapshots]
+    if len(alive) < len(workers):
+        # drop workers whose snapshot expired (restarted or gone), or the
+        # list grows with every deploy; a live one dropped by a racing
+        # update re-registers on its next flush
+        cache.set(WORKERS_KEY, alive, None)
+    merged = Registry()
+    for snapshot in snapshots.values():
+        merged.merge_snapshot(snapshot)
+    return merged
+
+
+class RequestTimings:
+    """What one request spent, filled in while it runs."""
+
+    __slots__ = ('sql_time', 'sql_count', 'template_time', 'template_depth')
+
+    def __init__(self):
+        self.sql_time = 0.0
+        self.sql_count = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    # installed once per connection and charged to whichever request is
+    # current. Async views run their queries on a worker thread with its
+    # own connection, but sync_to_async carries the context var across
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql_time += time.perf_counter() - start
+        timings.sql_count += 1
+
+
+def install_sql_wrapper(connection, **kwargs):
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        if timings is None:
+            return super().render(context, request)
+        # render_to_string inside a render shouldn't be counted twice
+        timings.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_depth -= 1
+            if timings.template_depth == 0:
+                timings.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The normal Django template backend, with render time reported to the metrics middleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def _labels(**labels):
+    inner = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    return '{' + inner + '}'
+
+
+def render_prometheus(merged, page_cache_stats=None):
+    lines = []
+    for name, (help_text, buckets) in METRICS.items():
+        full = PREFIX + name
+        lines.append(f'# HELP {full} {help_text}')
+        lines.append(f'# TYPE {full} histogram')
+        for view in sorted(merged.views):
+            h = merged.views[view][name]
+            running = 0
+            for bound, n in zip(list(buckets) + ['+Inf'], h.counts):
+                running += n
+                lines.append(f'{full}_bucket{_labels(view=view, le=bound)} {running}')
+            lines.append(f'{full}_sum{_labels(view=view)} {h.total}')
+            lines.append(f'{full}_count{_labels(view=view)} {h.count}')
+
+    if page_cache_stats:
+        for kind in ('hits', 'misses'):
+            full = f'{PREFIX}page_cache_{kind}_total'
+            lines.append(f'# HELP {full} Page cache {kind} (see events/cache.py).')
+            lines.append(f'# TYPE {full} counter')
+            for page, counts in page_cache_stats.items():
+                lines.append(f'{full}{_labels(page=page)} {counts[kind]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    body = render_prometheus(collect(), cache_stats())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
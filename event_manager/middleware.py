@@ -0,0 +1,86 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import RequestTimings, current_timings, flush, flush_due, install_sql_wrapper, registry
+
+
+class RequestMetricsMiddleware:
+    """
+    Records total latency, SQL count/time and template time for a sample of
+    requests, per resolved view name. With METRICS_SAMPLE_RATE = 0 an
+    unsampled request costs one random() call. Works under WSGI and ASGI;
+    with the async views (ASYNC_READ_VIEWS) it stays async so requests
+    don't get pushed onto a thread just for this.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # the scrape endpoint would otherwise mostly measure itself
+    skip_views = {'metrics'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        # every connection gets the SQL timer once, including ones that
+        # were opened before the first request
+        connection_created.connect(install_sql_wrapper)
+        for conn in connections.all(initialized_only=True):
+            install_sql_wrapper(conn)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        if self.record(request, timings, time.perf_counter() - start):
+            flush()
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        if self.record(request, timings, time.perf_counter() - start) and flush_due():
+            # the cache may be the database one, so not from the event loop
+            await sync_to_async(flush)()
+        return response
+
+    def record(self, request, timings, elapsed):
+        match = request.resolver_match
+        view_name = (match.url_name or match.view_name) if match else 'unresolved'
+        if view_name in self.skip_views:
+            return False
+        registry.observe(view_name, {
+            'request_duration_seconds': elapsed,
+            'sql_duration_seconds': timings.sql_time,
+            'sql_queries': timings.sql_count,
+            'template_duration_seconds': timings.template_time,
+        })
+        return True
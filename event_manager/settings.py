@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,6 +27,9 @@ INSTALLED_APPS = [
 ] + my_local_apps
 
 MIDDLEWARE = [
+    # first, so the numbers include every other middleware
+    'event_manager.middleware.RequestMetricsMiddleware',
+    'event_manager.db_router.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,7 +43,8 @@ ROOT_URLCONF = 'event_manager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # plain DjangoTemplates plus render timing for the metrics middleware
+        'BACKEND': 'event_manager.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,6 +71,43 @@ DATABASES = {
     }
 }
 
+# locmem is per process, which is fine for runserver. With several workers
+# use EVENT_MANAGER_CACHE=file or =db (run `manage.py createcachetable`
+# first) so they share cached pages and the invalidation counters.
+# Django's default of 300 entries is less than one long page of event
+# cards (events/fragments.py), hence the higher MAX_ENTRIES
+CACHE_OPTIONS = {'MAX_ENTRIES': 50000}
+CACHE_PROFILES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'event-manager',
+        'OPTIONS': CACHE_OPTIONS,
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'event_manager_cache'),
+        'OPTIONS': CACHE_OPTIONS,
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': CACHE_OPTIONS,
+    },
+}
+
+# aliases from DATABASES that are read replicas of 'default'. Reads during
+# a request go to a healthy one, unless the client wrote something in the
+# last REPLICA_PIN_SECONDS. See event_manager/db_router.py and
+# settings_replicas.py for a local two-SQLite-file setup
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['event_manager.db_router.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 15
+REPLICA_HEALTH_CHECK_INTERVAL = 10
+
+CACHES = {
+    'default': CACHE_PROFILES[os.environ.get('EVENT_MANAGER_CACHE', 'locmem')],
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -81,3 +124,22 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# dotted path to a class from events/search.py, None = pick one for the DB vendor
+EVENT_SEARCH_BACKEND = None
+
+# how paginated lists (the venue list) get their total: 'exact' runs a
+# COUNT, 'estimate' uses PostgreSQL's row estimate instead when the list
+# isn't filtered and the table has at least LIST_COUNT_ESTIMATE_MIN_ROWS
+LIST_COUNT_MODE = 'exact'
+LIST_COUNT_ESTIMATE_MIN_ROWS = 100_000
+
+# share of requests the metrics middleware measures (0 turns it off),
+# and how often each worker publishes its numbers for /metrics
+METRICS_SAMPLE_RATE = 1.0
+METRICS_FLUSH_INTERVAL = 10
+
+# serve the read-only pages (home, event list/detail, venue detail,
+# categories) with the async views, for running under ASGI (asgi.py).
+# EVENT_MANAGER_ASYNC_VIEWS=1 turns it on without editing this file
+ASYNC_READ_VIEWS = os.environ.get('EVENT_MANAGER_ASYNC_VIEWS') == '1'
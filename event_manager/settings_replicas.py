@@ -0,0 +1,17 @@
+# Primary + read replica on two local SQLite files, for trying out
+# event_manager/db_router.py without a real replication setup:
+#   python manage.py migrate --settings=event_manager.settings_replicas
+#   python manage.py seed_data --settings=event_manager.settings_replicas
+#   python manage.py refresh_sqlite_replica --settings=event_manager.settings_replicas
+# The replica is opened read-only and only changes when it's refreshed, so
+# it behaves like a replica that's lagging behind. Delete the file to see
+# the health check route reads back to the primary.
+from .settings_sqlite import *  # noqa: F401,F403
+
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    # mode=ro: writes fail and a missing file is an error instead of a new empty database
+    'NAME': f'file:{BASE_DIR / "db-replica.sqlite3"}?mode=ro',
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_REPLICAS = ['replica']
@@ -0,0 +1,11 @@
+# Local profile for benchmarking and trying things out without PostgreSQL:
+#   python manage.py migrate --settings=event_manager.settings_sqlite
+#   python manage.py seed_data --settings=event_manager.settings_sqlite
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
@@ -2,11 +2,21 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from events.sync import sync_events
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('events.urls')),
     path('venues/', include('venues.urls')),
     path('categories/', include('categories.urls')),
+    # read-only JSON, see events/api.py
+    path('api/events/', include('events.api_urls')),
+    path('api/venues/', include('venues.api_urls')),
+    path('api/categories/', include('categories.api_urls')),
+    # changes since a cursor, for mirrors, see events/sync.py
+    path('sync/events', sync_events, name='sync_events'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # custom 404 page - need this for the exam requirement
@@ -1,9 +1,141 @@
-from django.contrib import admin
-from .models import Event
+import csv
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path
+
+from .importing import IMPORT_FORMATS, EventImporter, read_rows
+from .models import Event, ExpirySweep, Recurrence, RecurrenceException, Rsvp
+from .rsvp import cancel_rsvp
+
+# more than this and the admin message list gets silly
+MAX_REPORTED_ERRORS = 20
+
+
+class EventImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV or JSONL, same columns as manage.py import_events.')
+    format = forms.ChoiceField(choices=[(f, f.upper()) for f in IMPORT_FORMATS])
+
+
+class RecurrenceInline(admin.StackedInline):
+    model = Recurrence
+    extra = 0
+    max_num = 1
+    show_change_link = True
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
-    list_display = ['title', 'date', 'venue', 'status', 'price']
+    list_display = ['title', 'date', 'venue', 'status', 'price', 'attendee_count', 'max_attendees']
     list_filter = ['status']
     search_fields = ['title']
+    change_list_template = 'admin/events/event/change_list.html'
+    inlines = [RecurrenceInline]
+
+    def get_urls(self):
+        custom = [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='events_event_import',
+            ),
+        ]
+        return custom + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:events_event_changelist')
+
+        if request.method == 'POST':
+            form = EventImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                errors = []
+
+                def collect(line_no, message):
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append(f'line {line_no}: {message}')
+
+                # utf-8-sig also takes the byte order mark spreadsheet apps put in front
+                upload = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+                importer = EventImporter(on_error=collect)
+                try:
+                    stats = importer.run(read_rows(upload, form.cleaned_data['format']))
+                except (UnicodeDecodeError, csv.Error, ValueError) as exc:
+                    if isinstance(exc, UnicodeDecodeError):
+                        message = 'The file is not UTF-8 text.'
+                    else:
+                        message = f'The file could not be read: {exc}.'
+                    if importer.stats.created:
+                        # rows go in a batch at a time, the ones before the bad spot stay
+                        message += f' The {importer.stats.created} events before that point were imported.'
+                    form.add_error('file', message)
+                else:
+                    self.message_user(
+                        request,
+                        f'Imported {stats.created} of {stats.read} rows in {stats.elapsed:.1f}s.',
+                        messages.SUCCESS if not stats.failed else messages.WARNING,
+                    )
+                    for error in errors:
+                        self.message_user(request, error, messages.ERROR)
+                    if stats.failed > len(errors):
+                        self.message_user(request, f'...and {stats.failed - len(errors)} more errors.', messages.ERROR)
+                    return redirect('admin:events_event_changelist')
+        else:
+            form = EventImportForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import events',
+        }
+        return render(request, 'admin/events/event/import_form.html', context)
+
+
+class RecurrenceExceptionInline(admin.TabularInline):
+    model = RecurrenceException
+    extra = 1
+
+
+@admin.register(Recurrence)
+class RecurrenceAdmin(admin.ModelAdmin):
+    # the cancelled and moved dates of a series are edited here
+    list_display = ['event', 'frequency', 'interval', 'until', 'count', 'last_date']
+    list_filter = ['frequency']
+    list_select_related = ['event']
+    raw_id_fields = ['event']
+    inlines = [RecurrenceExceptionInline]
+
+
+@admin.register(ExpirySweep)
+class ExpirySweepAdmin(admin.ModelAdmin):
+    list_display = ['ran_at', 'cutoff', 'expired_count']
+    readonly_fields = ['ran_at', 'cutoff', 'expired_count', 'event_ids']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Rsvp)
+class RsvpAdmin(admin.ModelAdmin):
+    list_display = ['name', 'email', 'event', 'status', 'created_at']
+    list_filter = ['status']
+    search_fields = ['email', 'name']
+    list_select_related = ['event']
+    # status and seat counts only change through events/rsvp.py
+    readonly_fields = ['event', 'status', 'token', 'created_at', 'promoted_at', 'cancelled_at']
+    actions = ['cancel_selected']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # deleting a going RSVP would leave its seat taken; cancel it instead
+        return False
+
+    @admin.action(description='Cancel selected RSVPs')
+    def cancel_selected(self, request, queryset):
+        cancelled = sum(cancel_rsvp(entry) for entry in queryset)
+        self.message_user(request, f'Cancelled {cancelled} RSVPs.', messages.SUCCESS)
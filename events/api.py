@@ -0,0 +1,194 @@
+import json
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from categories.models import Category
+from venues.models import Venue
+from .conditional import conditional_page, event_validator, tables_validator
+from .filters import filter_events
+from .models import Event
+from .pagination import EVENT_SORT_KEYS, paginate_keyset
+
+try:
+    import orjson
+except ImportError:
+    # optional: several times faster, but the stdlib encoder does the same job
+    orjson = None
+
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# field name in the API -> what to ask values() for. Everything is read
+# with values() so no model instances are built; None means the field is
+# filled in afterwards for the whole page at once
+EVENT_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'date': 'date',
+    'time': 'time',
+    'price': 'price',
+    'status': 'status',
+    'max_attendees': 'max_attendees',
+    'venue': 'venue_id',
+    'venue_name': 'venue__name',
+    'venue_city': 'venue__city',
+    'categories': None,
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+class ApiError(Exception):
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _orjson_default(obj):
+    if isinstance(obj, Decimal):
+        # same as DjangoJSONEncoder: a string, so no precision is lost
+        return str(obj)
+    raise TypeError
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def api_view(view):
+    """GET only, and ApiError becomes a JSON error response."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as exc:
+            return json_response({'error': str(exc)}, status=exc.status)
+    return wrapper
+
+
+def parse_fields(request, available):
+    # ?fields=id,title,date -> just those, in that order; no fields= -> all
+    raw = request.GET.get('fields', '')
+    if not raw:
+        return list(available)
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ApiError(f'unknown field(s): {", ".join(unknown)}; available: {", ".join(available)}')
+    return fields
+
+
+def parse_limit(request, default=API_PAGE_SIZE, maximum=API_MAX_PAGE_SIZE):
+    raw = request.GET.get('limit', '')
+    if not raw:
+        return default
+    if not raw.isdigit() or int(raw) < 1:
+        raise ApiError('limit must be a positive integer')
+    return min(int(raw), maximum)
+
+
+def parse_date(request, name, default=None):
+    raw = request.GET.get(name, '')
+    if not raw:
+        if default is None:
+            raise ApiError(f'{name} is required, as YYYY-MM-DD')
+        return default
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise ApiError(f'{name} must be a date as YYYY-MM-DD')
+
+
+def columns_for(fields, lookups, *extra):
+    # pk and the sort field are always fetched, the cursor is built from them
+    columns = {'id', *extra}
+    columns.update(lookups[f] for f in fields if lookups[f])
+    return sorted(columns)
+
+
+def pick(row, fields, lookups):
+    return {f: row[lookups[f] or f] for f in fields}
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri('?' + params.urlencode())
+
+
+def keyset_payload(request, queryset, sort_key, fields, lookups, fill=None):
+    """
+    One page of `queryset` as {"next", "previous", "results"}, paginated
+    with the same keyset cursors as the HTML list. `fill(rows, fields)`
+    can add the None-lookup fields for the whole page in one go.
+    """
+    rows = queryset.values(*columns_for(fields, lookups, sort_key[0]))
+    page = paginate_keyset(rows, sort_key, request.GET.get('cursor'), per_page=parse_limit(request))
+    if fill is not None:
+        fill(page.object_list, fields)
+    return {
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+        'results': [pick(row, fields, lookups) for row in page.object_list],
+    }
+
+
+def detail_payload(queryset, pk, fields, lookups, fill=None):
+    row = queryset.filter(pk=pk).values(*columns_for(fields, lookups)).first()
+    if row is None:
+        raise ApiError('not found', status=404)
+    if fill is not None:
+        fill([row], fields)
+    return pick(row, fields, lookups)
+
+
+def fill_categories(rows, fields):
+    # every event on the page gets its categories from one through-table query
+    if 'categories' not in fields:
+        return
+    by_event = defaultdict(list)
+    links = (
+        Event.categories.through.objects
+        .filter(event_id__in=[row['id'] for row in rows])
+        .order_by('category__name')
+        .values_list('event_id', 'category_id', 'category__name', 'category__slug')
+    )
+    for event_id, pk, name, slug in links:
+        by_event[event_id].append({'id': pk, 'name': name, 'slug': slug})
+    for row in rows:
+        row['categories'] = by_event.get(row['id'], [])
+
+
+@conditional_page(tables_validator(Event, Venue, Category))
+@api_view
+def event_list(request):
+    # same search/venue/category/sort parameters as the HTML event list
+    fields = parse_fields(request, EVENT_FIELDS)
+    events, filters = filter_events(request.GET)
+    sort_key = EVENT_SORT_KEYS[filters['sort_by']]
+    return json_response(keyset_payload(request, events, sort_key, fields, EVENT_FIELDS, fill_categories))
+
+
+@conditional_page(event_validator)
+@api_view
+def event_detail(request, pk):
+    fields = parse_fields(request, EVENT_FIELDS)
+    return json_response(detail_payload(Event.objects.all(), pk, fields, EVENT_FIELDS, fill_categories))
@@ -0,0 +1,9 @@
+# events/api_urls.py
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path('', api.event_list, name='api_event_list'),
+    path('<int:pk>/', api.event_detail, name='api_event_detail'),
+]
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+from django.views import View
+
+from categories.models import Category
+from venues.models import Venue
+from .cache import acached_page_data
+from .conditional import conditional_page, event_validator, tables_validator
+from .facets import event_facets
+from .feed import aupcoming_slice
+from .filters import filter_events
+from .forms import RsvpForm
+from .fragments import event_cards
+from .models import Event
+from .pagination import EVENT_SORT_KEYS, apaginate_keyset, paginate_keyset
+from .recurrence import merge_for, merge_upcoming, series_context, upcoming_series
+
+
+# async twins of the read-only pages in views.py, picked by events/urls.py
+# when settings.ASYNC_READ_VIEWS is on. Same templates and queries, with the
+# independent queries started together. Everything a template touches has
+# to be loaded before render(): a lazy relation hit while rendering would
+# be a sync query inside the event loop.
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset.aiterator()]
+
+
+async def home(request):
+    async def build():
+        upcoming_events, series, some_venues, some_categories = await asyncio.gather(
+            aupcoming_slice(6),
+            # list() rather than aiterator(), which won't prefetch the exceptions
+            sync_to_async(list)(upcoming_series()),
+            alist(Venue.objects.order_by('name')[:4]),
+            alist(Category.objects.order_by('name')[:6]),
+        )
+        return {
+            'upcoming_events': merge_upcoming(upcoming_events, series, 6),
+            'some_venues': some_venues,
+            'some_categories': some_categories,
+        }
+
+    context = await acached_page_data(
+        'home', ('events', 'venues', 'categories'), build, vary=date.today().isoformat()
+    )
+    return render(request, 'events/home.html', context)
+
+
+@conditional_page(tables_validator(Event, Venue, Category))
+async def event_list(request):
+    events, filters = filter_events(request.GET, Event.objects.select_related('venue'))
+    sort_key = EVENT_SORT_KEYS[filters['sort_by']]
+    merge = merge_for(events, sort_key)
+    if merge is None:
+        paginate = apaginate_keyset(events, sort_key, request.GET.get('cursor'))
+    else:
+        # the series are read while merging, so the whole page runs in a thread
+        paginate = sync_to_async(paginate_keyset)(events, sort_key, request.GET.get('cursor'), merge=merge)
+    page, facets = await asyncio.gather(paginate, sync_to_async(event_facets)(filters))
+    # cache lookups plus a categories prefetch for the misses
+    cards = await sync_to_async(event_cards)(page.object_list)
+
+    return render(request, 'events/list.html', {
+        'events': page.object_list,
+        'cards': cards,
+        'page': page,
+        'facets': facets,
+        **filters,
+    })
+
+
+class EventDetailView(View):
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # method_decorator doesn't keep async methods async, so wrap the view
+        return conditional_page(event_validator)(super().as_view(**initkwargs))
+
+    async def get(self, request, pk):
+        event, event_categories = await asyncio.gather(
+            aget_object_or_404(Event.objects.select_related('venue', 'recurrence'), pk=pk),
+            alist(Category.objects.filter(events=pk)),
+        )
+        return render(request, 'events/detail.html', {
+            'event_categories': event_categories,
+            'rsvp_form': RsvpForm(),
+            **await sync_to_async(series_context)(event, request.GET.get('on')),
+        })
@@ -0,0 +1,97 @@
+from django import forms
+from django.urls import reverse
+
+from .api import ApiError
+
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+def _prefix_upper_bound(prefix):
+    # the smallest string after every string starting with `prefix`
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def prefix_search(queryset, expression, prefix, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Rows whose `expression` (e.g. Lower('name'), with a matching index)
+    starts with `prefix`, in that expression's order. The range bounds are
+    what the index is scanned with; the startswith only weeds out the odd
+    row a non-C collation sorts into the range.
+    """
+    matches = queryset.annotate(_prefix_key=expression)
+    if prefix:
+        prefix = prefix.lower()
+        matches = matches.filter(
+            _prefix_key__gte=prefix,
+            _prefix_key__lt=_prefix_upper_bound(prefix),
+            _prefix_key__startswith=prefix,
+        )
+    return matches.order_by('_prefix_key', 'pk')[:limit]
+
+
+def prefix_matches(queryset, expressions, prefix, limit=AUTOCOMPLETE_LIMIT):
+    # one small indexed query per expression instead of an OR the index
+    # can't answer in order; earlier expressions' matches come first
+    found = {}
+    for expression in expressions:
+        for obj in prefix_search(queryset, expression, prefix, limit):
+            found.setdefault(obj.pk, obj)
+        if len(found) >= limit:
+            break
+    return list(found.values())[:limit]
+
+
+def parse_autocomplete(request):
+    prefix = ' '.join(request.GET.get('q', '').split())
+    raw = request.GET.get('limit', '')
+    if not raw:
+        return prefix, AUTOCOMPLETE_LIMIT
+    if not raw.isdigit() or int(raw) < 1:
+        raise ApiError('limit must be a positive integer')
+    return prefix, min(int(raw), AUTOCOMPLETE_MAX_LIMIT)
+
+
+class AutocompleteMixin:
+    """
+    A select that only renders the chosen option(s), looked up by pk; the
+    rest are fetched from the `url_name` autocomplete endpoint as the user
+    types (static/js/autocomplete.js). The form field still checks the
+    submitted pks against its queryset, which only loads those rows.
+    """
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    class Media:
+        js = ['js/autocomplete.js']
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        chosen = [v for v in value if str(v).isdigit()]
+        choices = []
+        if not self.allow_multiple_selected and iterator.field.empty_label is not None:
+            choices.append(('', iterator.field.empty_label))
+        if chosen:
+            choices.extend(iterator.choice(obj) for obj in iterator.queryset.filter(pk__in=chosen))
+        # the base class builds the <option>s from self.choices
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
@@ -0,0 +1,112 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+
+PAGE_CACHE_TIMEOUT = 60 * 15
+
+# pages that go through cached_page_data, used for the hit/miss report
+CACHED_PAGES = ('home', 'category_list', 'event_facets', 'venue_cities')
+
+
+def _fresh_generation():
+    # start from the clock rather than 1 so a generation key that got
+    # evicted can never come back with a number an old page was stored under
+    return int(time.time() * 1000)
+
+
+def _generation_key(name):
+    return f'gen:{name}'
+
+
+def bump_generation(*names):
+    """
+    Invalidate every cached page that depends on any of `names`, once the
+    current transaction commits (straight away outside one). Bumping
+    before the commit would let a request that still sees the old rows
+    cache them under the new generation, where they'd stay until the
+    timeout.
+    """
+    transaction.on_commit(lambda: _bump(names))
+
+
+def _bump(names):
+    for name in names:
+        key = _generation_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_generation(), None)
+
+
+def get_generations(names):
+    keys = {_generation_key(name): name for name in names}
+    found = cache.get_many(keys)
+    generations = {}
+    for key, name in keys.items():
+        if key not in found:
+            cache.add(key, _fresh_generation(), None)
+            found[key] = cache.get(key)
+        generations[name] = found[key]
+    return generations
+
+
+def _count(kind, page):
+    key = f'stats:{kind}:{page}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _page_key(page, depends_on, vary):
+    generations = get_generations(depends_on)
+    parts = [page, vary] + [f'{name}{generations[name]}' for name in depends_on]
+    return 'page:' + ':'.join(str(p) for p in parts)
+
+
+def cached_page_data(page, depends_on, build, vary='', timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Returns the context `build()` produces for `page`, from the cache when
+    possible. The cache key includes the current generation of every model
+    group in `depends_on`, so bumping one of them (see the signal receivers)
+    makes the stored copy unreachable instead of having to find and delete it.
+    `build()` has to return plain data (lists, not lazy querysets).
+    """
+    key = _page_key(page, depends_on, vary)
+    data = cache.get(key)
+    if data is None:
+        _count('miss', page)
+        data = build()
+        cache.set(key, data, timeout)
+    else:
+        _count('hit', page)
+    return data
+
+
+async def acached_page_data(page, depends_on, build, vary='', timeout=PAGE_CACHE_TIMEOUT):
+    """cached_page_data for async views; `build` is a coroutine function here."""
+    # the generation bookkeeping is a handful of sync cache calls, one hop
+    key = await sync_to_async(_page_key)(page, depends_on, vary)
+    data = await cache.aget(key)
+    if data is None:
+        await sync_to_async(_count)('miss', page)
+        data = await build()
+        await cache.aset(key, data, timeout)
+    else:
+        await sync_to_async(_count)('hit', page)
+    return data
+
+
+def cache_stats():
+    keys = [f'stats:{kind}:{page}' for page in CACHED_PAGES for kind in ('hit', 'miss')]
+    found = cache.get_many(keys)
+    return {
+        page: {
+            'hits': found.get(f'stats:hit:{page}', 0),
+            'misses': found.get(f'stats:miss:{page}', 0),
+        }
+        for page in CACHED_PAGES
+    }
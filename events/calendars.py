@@ -0,0 +1,120 @@
+import hashlib
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+
+from categories.models import Category
+from .cache import bump_generation, get_generations
+from .conditional import conditional_response
+from .exports import iter_export_rows, stream_ical
+from .models import Event
+from .recurrence import running
+
+
+# a subscribed calendar keeps what it has already seen, so the feed only
+# needs recent and coming events
+CALENDAR_PAST_DAYS = 90
+
+# nothing expires on its own, a change bumps the feed's generation instead
+CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24
+
+# bumped for changes that can show up in any feed: venue and category
+# edits, and the bulk paths that skip the signals
+ALL_CALENDARS = 'calendars'
+
+
+def _generation_name(kind, key):
+    return f'calendar:{kind}:{key}'
+
+
+def calendar_events(today=None):
+    # drafts stay private; cancelled events stay in so subscribers see them go
+    since = (today or date.today()) - timedelta(days=CALENDAR_PAST_DAYS)
+    return Event.objects.exclude(status='draft').filter(Q(date__gte=since) | running(since))
+
+
+def invalidate_calendars(event_ids=(), venue_ids=(), category_ids=()):
+    """
+    Makes the next poll of every feed showing one of `event_ids` rebuild it,
+    along with the feeds of `venue_ids` and `category_ids` (for events that
+    just left a venue or category, or were deleted). The feeds are looked
+    up now, while the rows are as the caller sees them, and bumped when the
+    transaction commits.
+    """
+    venue_ids, category_ids = set(venue_ids), set(category_ids)
+    if event_ids:
+        venue_ids.update(Event.objects.filter(pk__in=event_ids).values_list('venue_id', flat=True))
+        category_ids.update(
+            Event.categories.through.objects.filter(event_id__in=event_ids).values_list('category_id', flat=True)
+        )
+    names = [_generation_name('venue', pk) for pk in venue_ids if pk is not None]
+    if category_ids:
+        # category feeds are found by slug
+        slugs = Category.objects.filter(pk__in=category_ids).values_list('slug', flat=True)
+        names += [_generation_name('category', slug) for slug in slugs]
+    bump_generation(*names)
+
+
+def _build(request, events, name):
+    rows = iter_export_rows(events.order_by('date', 'time', 'pk'))
+    body = ''.join(stream_ical(
+        rows,
+        domain=request.get_host().split(':')[0],
+        calendar_name=name,
+        url_for=lambda row: request.build_absolute_uri(reverse('event_detail', kwargs={'pk': row['id']})),
+    )).encode()
+    validators = {
+        'etag': '"%s"' % hashlib.md5(body, usedforsecurity=False).hexdigest(),
+        # only rebuilt after a change, so when it was built is when it last changed
+        'last_modified': int(time.time()),
+    }
+    return validators, body
+
+
+def calendar_feed(request, kind, key, build, filename):
+    """
+    The .ics feed for `kind` ('venue' or 'category') and `key`, rendered
+    once and then served from the cache until one of its events changes
+    (see invalidate_calendars), as a 304 when the client's copy is current.
+    `build()` returns the events queryset and the calendar name, or None
+    when there is no such feed. A poll is a couple of cache reads and no
+    queries; the validators are kept apart from the body so a 304 doesn't
+    read the body at all.
+    """
+    generation_name = _generation_name(kind, key)
+    generations = get_generations([ALL_CALENDARS, generation_name])
+    # the feed's window moves with the calendar
+    cache_key = (
+        f'ical:{kind}:{key}:{date.today().isoformat()}:'
+        f'{generations[ALL_CALENDARS]}:{generations[generation_name]}'
+    )
+    validators = cache.get(cache_key)
+    body = None
+
+    def render():
+        found = build()
+        if found is None:
+            raise Http404(f'No {kind} calendar for {key}')
+        validators, body = _build(request, *found)
+        cache.set_many({cache_key: validators, f'{cache_key}:body': body}, CALENDAR_CACHE_TIMEOUT)
+        return validators, body
+
+    if validators is None:
+        validators, body = render()
+
+    def respond():
+        nonlocal body
+        if body is None:
+            body = cache.get(f'{cache_key}:body')
+        if body is None:
+            # evicted on its own
+            _, body = render()
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+        return response
+
+    return conditional_response(request, validators['etag'], validators['last_modified'], respond)
@@ -0,0 +1,159 @@
+import hashlib
+from datetime import date, datetime, time, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import connections, router
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+
+from venues.models import Venue
+from .models import Event
+
+
+def _as_datetime(value):
+    # MAX() over a datetime column comes back as a string on SQLite
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def table_stamps(*models):
+    """
+    (newest updated_at, row count) for each model's table, all in one query.
+    MAX comes straight off the updated_at index; the count is there because
+    a delete doesn't leave a newer updated_at behind.
+    """
+    # whichever database the page itself will be read from
+    conn = connections[router.db_for_read(models[0])]
+    parts = []
+    for model in models:
+        table = conn.ops.quote_name(model._meta.db_table)
+        parts.append(f'(SELECT MAX(updated_at) FROM {table}), (SELECT COUNT(*) FROM {table})')
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(parts))
+        row = cursor.fetchone()
+    return [(_as_datetime(row[i]), row[i + 1]) for i in range(0, len(row), 2)]
+
+
+def newest(*values):
+    values = [_as_datetime(v) for v in values if v is not None]
+    return max(values) if values else None
+
+
+def tables_validator(*models):
+    # for list pages: anything changing in these tables changes the page
+    def validators(request, *args, **kwargs):
+        stamps = table_stamps(*models)
+        return stamps, newest(*(updated for updated, _ in stamps))
+    return validators
+
+
+def event_validator(request, pk):
+    # the event, its venue and its categories in one aggregate (there's
+    # only one row, Max() just unwraps it); adding or removing a category
+    # touches the event's updated_at (events/signals.py)
+    row = Event.objects.filter(pk=pk).aggregate(
+        updated=Max('updated_at'),
+        venue_pk=Max('venue_id'),
+        venue_updated=Max('venue__updated_at'),
+        categories_updated=Max('categories__updated_at'),
+        category_count=Count('categories'),
+        # RSVPs don't touch updated_at, but the page shows the seat count
+        attendees=Max('attendee_count'),
+    )
+    if row['updated'] is None:
+        return None
+    return row, newest(row['updated'], row['venue_updated'], row['categories_updated'])
+
+
+def venue_validator(request, pk):
+    row = Venue.objects.filter(pk=pk).aggregate(
+        updated=Max('updated_at'),
+        events_updated=Max('events__updated_at'),
+        event_count=Count('events'),
+    )
+    if row['updated'] is None:
+        return None
+    return row, newest(row['updated'], row['events_updated'])
+
+
+def _validators_header(found):
+    parts, last_modified = found
+    # never older than midnight, so If-Modified-Since alone can't
+    # keep yesterday's "upcoming" split alive
+    last_modified = newest(last_modified, timezone.make_aware(datetime.combine(timezone.localdate(), time.min)))
+    digest = hashlib.md5(repr((date.today(), parts)).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest), int(last_modified.timestamp())
+
+
+def _finish(response, etag, stamp):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(stamp))
+        # keep a copy but check back every time, the check is cheap
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_response(request, etag, last_modified, respond):
+    """
+    A 304 when the client's copy matches `etag` / `last_modified` (a
+    timestamp), else respond(); for views that already know their
+    validators, e.g. from a cached copy of the page.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = respond()
+    return _finish(response, etag, last_modified)
+
+
+def _skip(request):
+    # a pending flash message has to be rendered, not 304'd away
+    return request.method not in ('GET', 'HEAD') or 'messages' in request.COOKIES
+
+
+def conditional_page(validators):
+    """
+    ETag / Last-Modified / 304 for a GET view, sync or async.
+
+    validators(request, *args, **kwargs) returns (parts, last_modified)
+    from one cheap query, or None to just run the view (e.g. so a missing
+    object still gets the normal 404). parts is anything with a stable
+    repr; it's hashed into the ETag together with today's date, since
+    several pages change on their own at midnight. When the client's copy
+    is still current the view never runs, so no templates and no main
+    queries.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if _skip(request):
+                    return await view(request, *args, **kwargs)
+                found = await sync_to_async(validators)(request, *args, **kwargs)
+                if found is None:
+                    return await view(request, *args, **kwargs)
+                etag, stamp = _validators_header(found)
+                response = get_conditional_response(request, etag=etag, last_modified=stamp)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(response, etag, stamp)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if _skip(request):
+                return view(request, *args, **kwargs)
+            found = validators(request, *args, **kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+            etag, stamp = _validators_header(found)
+            return conditional_response(request, etag, stamp, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
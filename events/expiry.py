@@ -0,0 +1,60 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+
+from categories.models import Category
+from . import feed
+from .cache import bump_generation
+from .calendars import ALL_CALENDARS
+from .models import ChangeLog, Event, ExpirySweep, Recurrence
+
+
+def expired_events(cutoff=None):
+    # published but already over; a range scan on (status, date). A series
+    # whose first date is behind it but with dates to come isn't over
+    cutoff = cutoff or date.today()
+    still_running = Recurrence.objects.filter(Q(last_date__isnull=True) | Q(last_date__gte=cutoff))
+    return Event.objects.filter(status='published', date__lt=cutoff).exclude(pk__in=still_running.values('event_id'))
+
+
+def sweep_expired_events(cutoff=None, dry_run=False):
+    """
+    Cancels every published event dated before `cutoff` (today by default),
+    other than series still running, with one UPDATE and logs the run as
+    an ExpirySweep. Returns the sweep, unsaved when dry_run, or None when
+    there was nothing to do.
+
+    The UPDATE skips save() and the signals, so the category counters, the
+    page cache generations and the sync log are refreshed here instead.
+    """
+    cutoff = cutoff or date.today()
+    with transaction.atomic():
+        if not dry_run:
+            # the daily roll-forward of the homepage feed rides along
+            feed.roll_forward(cutoff)
+        expired = expired_events(cutoff)
+        # locked so an edit can't slip in between reading the ids and the UPDATE
+        event_ids = list(expired.select_for_update().values_list('pk', flat=True))
+        if not event_ids:
+            return None
+        sweep = ExpirySweep(cutoff=cutoff, expired_count=len(event_ids), event_ids=event_ids)
+        if dry_run:
+            return sweep
+
+        # the categories have to be read first, once cancelled these events
+        # look like any other cancelled event
+        category_ids = set(
+            Event.categories.through.objects
+            .filter(event__in=expired)
+            .values_list('category_id', flat=True)
+            .distinct()
+        )
+        sweep.expired_count = expired.update(status='cancelled', updated_at=Now())
+        ChangeLog.objects.record(ChangeLog.EVENT, event_ids)
+        if category_ids:
+            Category.objects.refresh_event_counts(category_ids)
+        sweep.save()
+    bump_generation('events', ALL_CALENDARS)
+    return sweep
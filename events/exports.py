@@ -0,0 +1,190 @@
+import csv
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import islice
+
+from .models import Event, RecurrenceException
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = [
+    'id', 'title', 'description', 'date', 'time', 'price', 'status', 'max_attendees',
+    'updated_at', 'venue__name', 'venue__city', 'venue__address',
+    'recurrence__frequency', 'recurrence__interval', 'recurrence__until', 'recurrence__count',
+]
+
+CSV_HEADER = [
+    'id', 'title', 'description', 'date', 'time', 'price', 'status', 'max_attendees',
+    'venue', 'city', 'categories',
+]
+
+ICAL_STATUS = {
+    'published': 'CONFIRMED',
+    'draft': 'TENTATIVE',
+    'cancelled': 'CANCELLED',
+}
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields plain dicts for every event in `queryset` (already filtered and
+    ordered), each with a 'categories' list of names. Rows come from
+    values().iterator() so no model instances are built and only one chunk
+    is in memory; category names, and the exceptions of recurring events
+    (as 'exceptions'), are fetched with one query per chunk each.
+    """
+    rows = queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    through = Event.categories.through
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        names = defaultdict(list)
+        links = (
+            through.objects
+            .filter(event_id__in=[row['id'] for row in chunk])
+            .order_by('category__name')
+            .values_list('event_id', 'category__name')
+        )
+        for event_id, name in links:
+            names[event_id].append(name)
+        exceptions = defaultdict(list)
+        series_ids = [row['id'] for row in chunk if row['recurrence__frequency']]
+        if series_ids:
+            changed = (
+                RecurrenceException.objects
+                .filter(recurrence__event_id__in=series_ids)
+                .values('recurrence__event_id', 'original_date', 'cancelled', 'date', 'time')
+            )
+            for exception in changed:
+                exceptions[exception['recurrence__event_id']].append(exception)
+        for row in chunk:
+            row['categories'] = names.get(row['id'], [])
+            row['exceptions'] = exceptions.get(row['id'], [])
+            yield row
+
+
+class Echo:
+    # csv.writer wants a file; this one just hands each line back
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow([
+            row['id'], row['title'], row['description'], row['date'], row['time'] or '',
+            row['price'], row['status'], row['max_attendees'] or '',
+            row['venue__name'] or '', row['venue__city'] or '', '|'.join(row['categories']),
+        ])
+
+
+def ical_escape(text):
+    return (
+        str(text)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def ical_line(line):
+    # RFC 5545: lines longer than 75 octets are folded with CRLF + space
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # don't cut a multi-byte character in half
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # continuation lines lose one octet to the leading space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def ical_timestamp(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ical_start(day, time, prop='DTSTART'):
+    if time:
+        # floating local time, the project doesn't store time zones per venue
+        return f'{prop}:{datetime.combine(day, time).strftime("%Y%m%dT%H%M%S")}'
+    return f'{prop};VALUE=DATE:{day.strftime("%Y%m%d")}'
+
+
+def ical_rrule(row):
+    parts = [f'FREQ={row["recurrence__frequency"].upper()}', f'INTERVAL={row["recurrence__interval"]}']
+    if row['recurrence__frequency'] == 'monthly' and row['date'].day > 28:
+        # the 29th-31st fall on the last day of shorter months
+        parts.append('BYMONTHDAY=' + ','.join(str(day) for day in range(28, row['date'].day + 1)) + ';BYSETPOS=-1')
+    if row['recurrence__until']:
+        # UNTIL has to be the same kind of value as DTSTART
+        until = row['recurrence__until']
+        parts.append(f'UNTIL={until.strftime("%Y%m%d")}' + ('T235959' if row['time'] else ''))
+    if row['recurrence__count']:
+        parts.append(f'COUNT={row["recurrence__count"]}')
+    return 'RRULE:' + ';'.join(parts)
+
+
+def ical_event(row, domain, url='', uid=None):
+    uid = uid or f'event-{row["id"]}'
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{domain}',
+        f'DTSTAMP:{ical_timestamp(row["updated_at"])}',
+        f'LAST-MODIFIED:{ical_timestamp(row["updated_at"])}',
+    ]
+    lines.append(ical_start(row['date'], row['time']))
+    moved = []
+    if row.get('recurrence__frequency'):
+        lines.append(ical_rrule(row))
+        # cancelled and moved dates drop out of the rule; moved ones come
+        # back as events of their own below
+        for exception in row['exceptions']:
+            lines.append(ical_start(exception['original_date'], row['time'], 'EXDATE'))
+            if not exception['cancelled']:
+                moved.append(exception)
+    lines.append(f'SUMMARY:{ical_escape(row["title"])}')
+    if row['description']:
+        lines.append(f'DESCRIPTION:{ical_escape(row["description"])}')
+    if row['venue__name']:
+        where = ', '.join(p for p in (row['venue__name'], row['venue__address'], row['venue__city']) if p)
+        lines.append(f'LOCATION:{ical_escape(where)}')
+    if row['categories']:
+        lines.append('CATEGORIES:' + ','.join(ical_escape(name) for name in row['categories']))
+    lines.append(f'STATUS:{ICAL_STATUS.get(row["status"], "TENTATIVE")}')
+    if url:
+        lines.append(f'URL:{url}')
+    lines.append('END:VEVENT')
+    text = ''.join(ical_line(line) for line in lines)
+    for exception in moved:
+        one_off = dict(
+            row,
+            date=exception['date'] or exception['original_date'],
+            time=exception['time'] or row['time'],
+            recurrence__frequency=None,
+        )
+        text += ical_event(one_off, domain, url, uid=f'event-{row["id"]}-{exception["original_date"]:%Y%m%d}')
+    return text
+
+
+def stream_ical(rows, domain, calendar_name='LocalVibe events', url_for=None):
+    yield ical_line('BEGIN:VCALENDAR')
+    yield ical_line('VERSION:2.0')
+    yield ical_line('PRODID:-//LocalVibe//Event Manager//EN')
+    yield ical_line('CALSCALE:GREGORIAN')
+    yield ical_line(f'X-WR-CALNAME:{ical_escape(calendar_name)}')
+    for row in rows:
+        yield ical_event(row, domain, url_for(row) if url_for else '')
+    yield ical_line('END:VCALENDAR')
@@ -0,0 +1,112 @@
+import hashlib
+import json
+
+from django.db.models import Count
+
+from categories.models import Category
+from venues.models import Venue
+from .cache import cached_page_data
+from .filters import PRICE_BANDS, STATUSES, apply_filters
+from .models import Event
+
+
+# what a filter combination is, for the cache key; sort order doesn't
+# change the counts, and search is case-insensitive on every backend
+def facets_key(filters):
+    normalized = [
+        ' '.join(filters['search_query'].casefold().split()),
+        filters['selected_venue_id'],
+        filters['selected_category_id'],
+        filters['selected_status'],
+        filters['selected_price'],
+    ]
+    return hashlib.md5(json.dumps(normalized).encode()).hexdigest()
+
+
+def _option(value, label, count, selected):
+    return {'value': str(value), 'label': label, 'count': count, 'selected': str(value) == selected}
+
+
+def _grouped(filters, skip, field, label_field=None):
+    # one GROUP BY over the events matching every filter except `skip`'s own,
+    # so the counts say what picking each value instead would give
+    fields = [field, label_field] if label_field else [field]
+    return (
+        apply_filters(Event.objects.all(), filters, skip=skip)
+        .filter(**{f'{field}__isnull': False})
+        .values(*fields)
+        .annotate(count=Count('pk'))
+        .order_by(label_field or field)
+    )
+
+
+def _keep_selected(options, selected, label_for):
+    # a selected value with no matches still needs an option, or the
+    # dropdown would silently show "All" while the filter is applied
+    if selected and not any(option['selected'] for option in options):
+        label = label_for(selected)
+        if label is not None:
+            options.append(_option(selected, label, 0, selected))
+    return options
+
+
+def venue_facet(filters):
+    selected = filters['selected_venue_id']
+    options = [
+        _option(row['venue_id'], row['venue__name'], row['count'], selected)
+        for row in _grouped(filters, 'venue', 'venue_id', 'venue__name')
+    ]
+    return _keep_selected(
+        options, selected, lambda pk: Venue.objects.filter(pk=pk).values_list('name', flat=True).first()
+    )
+
+
+def category_facet(filters):
+    selected = filters['selected_category_id']
+    options = [
+        _option(row['categories__id'], row['categories__name'], row['count'], selected)
+        for row in _grouped(filters, 'category', 'categories__id', 'categories__name')
+    ]
+    return _keep_selected(
+        options, selected, lambda pk: Category.objects.filter(pk=pk).values_list('name', flat=True).first()
+    )
+
+
+def status_facet(filters):
+    selected = filters['selected_status']
+    counts = {row['status']: row['count'] for row in _grouped(filters, 'status', 'status')}
+    options = [
+        _option(value, label, counts[value], selected)
+        for value, label in STATUSES.items() if counts.get(value)
+    ]
+    return _keep_selected(options, selected, STATUSES.get)
+
+
+def price_facet(filters):
+    # the bands overlap nothing, so one pass with a filtered COUNT per band
+    selected = filters['selected_price']
+    counts = apply_filters(Event.objects.all(), filters, skip='price').aggregate(**{
+        key: Count('pk', filter=q) for key, _, q in PRICE_BANDS
+    })
+    options = [_option(key, label, counts[key], selected) for key, label, _ in PRICE_BANDS if counts[key]]
+    labels = {key: label for key, label, _ in PRICE_BANDS}
+    return _keep_selected(options, selected, labels.get)
+
+
+def event_facets(filters):
+    """
+    Counts for the event_list filter dropdowns: per venue, category, status
+    and price band, for the current search and filters, leaving out values
+    with no matches. Four queries whatever the number of venues and
+    categories, and cached per filter combination until events, venues or
+    categories change.
+    """
+    def build():
+        return {
+            'venue': venue_facet(filters),
+            'category': category_facet(filters),
+            'status': status_facet(filters),
+            'price': price_facet(filters),
+        }
+
+    return cached_page_data('event_facets', ('events', 'venues', 'categories'), build, vary=facets_key(filters))
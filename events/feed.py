@@ -0,0 +1,81 @@
+from datetime import date
+
+from .models import Event, UpcomingEvent
+
+
+FEED_ORDER = ['date', 'time', 'event']
+
+
+def belongs_in_feed(status, event_date, today=None):
+    # same rule as EventManager.upcoming()
+    return status == 'published' and event_date >= (today or date.today())
+
+
+def sync_event(event):
+    """Adds, moves or drops one event's feed row after it was saved."""
+    if belongs_in_feed(event.status, event.date):
+        UpcomingEvent.objects.update_or_create(
+            event_id=event.pk, defaults={'date': event.date, 'time': event.time}
+        )
+    else:
+        UpcomingEvent.objects.filter(event_id=event.pk).delete()
+
+
+def add_events(events, today=None):
+    # for bulk_create callers, which don't send post_save
+    rows = [
+        UpcomingEvent(event_id=e.pk, date=e.date, time=e.time)
+        for e in events
+        if belongs_in_feed(e.status, e.date, today)
+    ]
+    UpcomingEvent.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def roll_forward(today=None):
+    # yesterday's events drop off the front; one indexed DELETE
+    return UpcomingEvent.objects.filter(date__lt=today or date.today()).delete()[0]
+
+
+def live_rows(today=None):
+    return Event.objects.filter(status='published', date__gte=today or date.today()).values_list('pk', 'date', 'time')
+
+
+def rebuild():
+    UpcomingEvent.objects.all().delete()
+    rows = [UpcomingEvent(event_id=pk, date=d, time=t) for pk, d, t in live_rows().iterator()]
+    UpcomingEvent.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _slice_query(limit, today=None):
+    return (
+        UpcomingEvent.objects
+        .filter(date__gte=today or date.today())
+        .select_related('event__venue')
+        .order_by(*FEED_ORDER)[:limit]
+    )
+
+
+def upcoming_slice(limit, today=None):
+    """
+    The first `limit` upcoming events, venue included, in one query. The
+    date bound only picks where the index scan starts, so a late
+    roll_forward() can't put yesterday on the homepage.
+    """
+    return [entry.event for entry in _slice_query(limit, today)]
+
+
+async def aupcoming_slice(limit, today=None):
+    return [entry.event async for entry in _slice_query(limit, today).aiterator()]
+
+
+def compare_with_live(today=None):
+    """(missing, extra, stale) event ids between the feed and the live query."""
+    live = {pk: (d, t) for pk, d, t in live_rows(today)}
+    # the whole table, so rows a roll_forward() missed count as extra
+    stored = {pk: (d, t) for pk, d, t in UpcomingEvent.objects.values_list('event_id', 'date', 'time')}
+    missing = sorted(live.keys() - stored.keys())
+    extra = sorted(stored.keys() - live.keys())
+    stale = sorted(pk for pk in live.keys() & stored.keys() if live[pk] != stored[pk])
+    return missing, extra, stale
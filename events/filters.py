@@ -0,0 +1,86 @@
+from django.db.models import Q
+
+from .models import STATUS_CHOICES, Event
+from .pagination import EVENT_SORT_KEYS
+from .search import get_search_backend
+
+
+# the price filter's bands, in the order the facet lists them
+PRICE_BANDS = [
+    ('free', 'Free', Q(price=0)),
+    ('under-25', 'Under $25', Q(price__gt=0, price__lt=25)),
+    ('25-50', '$25 – $50', Q(price__gte=25, price__lt=50)),
+    ('50-100', '$50 – $100', Q(price__gte=50, price__lt=100)),
+    ('100-plus', '$100 and up', Q(price__gte=100)),
+]
+PRICE_BAND_FILTERS = {key: q for key, _, q in PRICE_BANDS}
+
+STATUSES = dict(STATUS_CHOICES)
+
+
+def clean_filters(params):
+    """The event_list filter values from `params`, with anything invalid dropped."""
+    search_query = params.get('search', '').strip()
+
+    selected_venue_id = params.get('venue', '')
+    if not selected_venue_id.isdigit():
+        selected_venue_id = ''
+
+    selected_category_id = params.get('category', '')
+    if not selected_category_id.isdigit():
+        selected_category_id = ''
+
+    selected_status = params.get('status', '')
+    if selected_status not in STATUSES:
+        selected_status = ''
+
+    selected_price = params.get('price', '')
+    if selected_price not in PRICE_BAND_FILTERS:
+        selected_price = ''
+
+    # no explicit sort means best match first when searching, date otherwise
+    sort_by = params.get('sort', '')
+    if sort_by not in EVENT_SORT_KEYS or (sort_by == 'relevance' and not search_query):
+        sort_by = 'relevance' if search_query else 'date'
+
+    return {
+        'search_query': search_query,
+        'selected_venue_id': selected_venue_id,
+        'selected_category_id': selected_category_id,
+        'selected_status': selected_status,
+        'selected_price': selected_price,
+        'sort_by': sort_by,
+    }
+
+
+def apply_filters(events, filters, skip=None):
+    """
+    Narrows `events` by the values from clean_filters. `skip` names one
+    filter ('venue', 'category', 'status' or 'price') to leave out, which
+    is how the facet counts for that filter are worked out.
+    """
+    if filters['search_query']:
+        events = get_search_backend().search(events, filters['search_query'])
+    if filters['selected_venue_id'] and skip != 'venue':
+        events = events.filter(venue__id=filters['selected_venue_id'])
+    if filters['selected_category_id'] and skip != 'category':
+        # no distinct() needed: (event, category) is unique in the through
+        # table, so filtering on a single category can't duplicate rows
+        events = events.filter(categories__id=filters['selected_category_id'])
+    if filters['selected_status'] and skip != 'status':
+        events = events.filter(status=filters['selected_status'])
+    if filters['selected_price'] and skip != 'price':
+        events = events.filter(PRICE_BAND_FILTERS[filters['selected_price']])
+    return events
+
+
+def filter_events(params, queryset=None):
+    """
+    The event_list filters (search, venue, category, status, price, sort)
+    applied to `queryset`, shared by the HTML list and the exports so they
+    always agree on what "the filtered list" is. Returns the filtered
+    queryset (not ordered yet) and the cleaned filter values for the template.
+    """
+    events = Event.objects.all() if queryset is None else queryset
+    filters = clean_filters(params)
+    return apply_filters(events, filters), filters
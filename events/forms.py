@@ -1,12 +1,118 @@
 from django import forms
+from django.db import IntegrityError, transaction
 from datetime import date
 
-from .models import Event, STATUS_CHOICES
+from .autocomplete import AutocompleteSelect, AutocompleteSelectMultiple
+from .models import Event, Recurrence, Rsvp, STATUS_CHOICES, VENUE_CONFLICT_MESSAGE, clash_message
+from venues.availability import next_free_dates, occupancy, series_days
 from venues.models import Venue
 from categories.models import Category
 
 
-class EventForm(forms.ModelForm):
+class BookingSaveMixin:
+    # The venue/date rule is the unique_active_event_per_venue_date
+    # constraint on Event, but later dates of recurring events have no rows
+    # for it to see. So clean() checks the day and the series dates against
+    # the venue's bookings and rules in one occupancy() lookup, and the
+    # constraint is left out of the form's validation rather than asked a
+    # second time. save_booking() checks again with the venue row locked,
+    # for whoever booked a series date between validation and our save, and
+    # turns the constraint's IntegrityError into the same form error for a
+    # first date booked in that window (SQLite ignores the lock).
+    # Either way the error comes with the venue's next free dates.
+
+    def clean(self):
+        cleaned_data = super().clean()
+        self.instance._venue_day_checked = True
+        self.check_venue()
+        return cleaned_data
+
+    def check_venue(self):
+        """
+        Adds an error when the venue is booked on the day, or on one of the
+        series dates the repeat fields describe. Returns whether it's free.
+        """
+        venue, first = self.cleaned_data.get('venue'), self.cleaned_data.get('date')
+        if venue is None or first is None or self.cleaned_data.get('status') == 'cancelled':
+            return True
+        rule = self.recurrence_rule()
+        days = [first]
+        if rule is not None:
+            days += series_days(rule, first, list(rule.exceptions.all()) if rule.pk else [])
+        taken = occupancy(first, days[-1], [venue.pk], exclude_event_id=self.instance.pk)
+        free = True
+        if not taken.is_free(venue.pk, first):
+            self.add_error(None, VENUE_CONFLICT_MESSAGE)
+            free = False
+        clashes = [day for day in days[1:] if not taken.is_free(venue.pk, day)]
+        if clashes:
+            self.add_error('repeats', clash_message(venue, clashes))
+            free = False
+        return free
+
+    def recurrence_rule(self):
+        # the rule the repeat fields describe, unsaved; None for a one-off
+        frequency = self.cleaned_data.get('repeats')
+        if not frequency:
+            return None
+        rule = getattr(self.instance, 'recurrence', None) or Recurrence()
+        rule.frequency = frequency
+        rule.until = self.cleaned_data.get('repeat_until')
+        return rule
+
+    def clean_repeat_until(self):
+        until = self.cleaned_data.get('repeat_until')
+        first = self.cleaned_data.get('date')
+        if until and first and until < first:
+            raise forms.ValidationError('The series has to end after its first date.')
+        return until
+
+    def add_error(self, field, error):
+        super().add_error(field, error)
+        if field is None and not getattr(self, '_suggested_dates', False) \
+                and VENUE_CONFLICT_MESSAGE in self.non_field_errors():
+            self._suggested_dates = True
+            self.suggest_free_dates()
+
+    def suggest_free_dates(self):
+        venue = self.cleaned_data.get('venue')
+        wanted = self.cleaned_data.get('date')
+        if venue is None or wanted is None:
+            return
+        free = next_free_dates(venue.pk, wanted, exclude_event_id=self.instance.pk)
+        if free:
+            days = ', '.join(day.strftime('%a %d %b') for day in free)
+            self.add_error(None, f'{venue.name} is free on {days}.')
+
+    def save_booking(self):
+        try:
+            with transaction.atomic():
+                venue = self.cleaned_data.get('venue')
+                if venue is not None:
+                    # bookings for the venue take turns from here to the
+                    # commit, so a series and a one-off saved at once can't
+                    # both pass the check again; the constraint only sees
+                    # first dates
+                    Venue.objects.select_for_update().get(pk=venue.pk)
+                    if not self.check_venue():
+                        return None
+                event = self.save()
+                self.save_recurrence(event)
+                return event
+        except IntegrityError:
+            self.add_error(None, VENUE_CONFLICT_MESSAGE)
+            return None
+
+    def save_recurrence(self, event):
+        rule = self.recurrence_rule()
+        if rule is None:
+            Recurrence.objects.filter(event=event).delete()
+            return
+        rule.event = event
+        rule.save()
+
+
+class EventForm(BookingSaveMixin, forms.ModelForm):
     # keeping title and date explicit so we can set proper error messages
     title = forms.CharField(
         max_length=200,
@@ -20,6 +126,17 @@ class EventForm(forms.ModelForm):
         widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         error_messages={'required': 'Date is required.', 'invalid': 'Not a valid date.'}
     )
+    repeats = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Does not repeat')] + Recurrence.FREQUENCY_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    repeat_until = forms.DateField(
+        required=False,
+        label='Repeat until',
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        help_text='Leave blank to keep repeating.',
+    )
 
     class Meta:
         model = Event
@@ -27,8 +144,9 @@ class EventForm(forms.ModelForm):
         widgets = {
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4, 'placeholder': 'Describe the event...'}),
             'time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
-            'venue': forms.Select(attrs={'class': 'form-select'}),
-            'categories': forms.CheckboxSelectMultiple(),
+            # only the chosen venue/categories are rendered, the rest are searched for
+            'venue': AutocompleteSelect('api_venue_autocomplete', attrs={'class': 'form-select'}),
+            'categories': AutocompleteSelectMultiple('api_category_autocomplete', attrs={'class': 'form-select'}),
             'price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
             'max_attendees': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Leave blank for unlimited'}),
@@ -50,24 +168,8 @@ class EventForm(forms.ModelForm):
             raise forms.ValidationError('The event date cannot be in the past.')
         return event_date
 
-    def clean(self):
-        cleaned = super().clean()
-        venue = cleaned.get('venue')
-        event_date = cleaned.get('date')
-
-        # venue conflict check lives here rather than the model because
-        # we need both venue and date from the form at the same time
-        if venue and event_date:
-            conflicts = Event.objects.filter(venue=venue, date=event_date)
-            if conflicts.exists():
-                raise forms.ValidationError(
-                    f'That venue already has {conflicts.count()} event(s) on this date.'
-                )
-
-        return cleaned
-
 
-class EventEditForm(forms.ModelForm):
+class EventEditForm(BookingSaveMixin, forms.ModelForm):
     title = forms.CharField(
         max_length=200,
         widget=forms.TextInput(attrs={'class': 'form-control'}),
@@ -77,6 +179,17 @@ class EventEditForm(forms.ModelForm):
         widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         error_messages={'required': 'Date is required.', 'invalid': 'Invalid date.'}
     )
+    repeats = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Does not repeat')] + Recurrence.FREQUENCY_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    repeat_until = forms.DateField(
+        required=False,
+        label='Repeat until',
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        help_text='Leave blank to keep repeating.',
+    )
     created_at = forms.CharField(
         required=False,
         label='Created at',
@@ -93,8 +206,9 @@ class EventEditForm(forms.ModelForm):
         widgets = {
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
             'time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
-            'venue': forms.Select(attrs={'class': 'form-select'}),
-            'categories': forms.CheckboxSelectMultiple(),
+            # only the chosen venue/categories are rendered, the rest are searched for
+            'venue': AutocompleteSelect('api_venue_autocomplete', attrs={'class': 'form-select'}),
+            'categories': AutocompleteSelectMultiple('api_category_autocomplete', attrs={'class': 'form-select'}),
             'price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
             'max_attendees': forms.NumberInput(attrs={'class': 'form-control'}),
@@ -104,6 +218,10 @@ class EventEditForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.instance and self.instance.pk and self.instance.created_at:
             self.fields['created_at'].initial = self.instance.created_at.strftime('%Y-%m-%d %H:%M')
+        rule = getattr(self.instance, 'recurrence', None)
+        if rule is not None:
+            self.fields['repeats'].initial = rule.frequency
+            self.fields['repeat_until'].initial = rule.until
 
     def clean_title(self):
         t = self.cleaned_data.get('title', '').strip()
@@ -111,16 +229,13 @@ class EventEditForm(forms.ModelForm):
             raise forms.ValidationError('Title is too short.')
         return t
 
-    def clean(self):
-        cleaned = super().clean()
-        venue = cleaned.get('venue')
-        event_date = cleaned.get('date')
-
-        if venue and event_date:
-            existing = Event.objects.filter(venue=venue, date=event_date).exclude(pk=self.instance.pk)
-            if existing.exists():
-                raise forms.ValidationError(
-                    f'Venue is already booked on this date ({existing.count()} event(s)).'
-                )
-
-        return cleaned
+
+class RsvpForm(forms.ModelForm):
+
+    class Meta:
+        model = Rsvp
+        fields = ['name', 'email']
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Your name'}),
+            'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'you@example.com'}),
+        }
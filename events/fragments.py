@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import get_generations
+
+
+# a card's key changes whenever what it shows changes, so entries are never
+# deleted, old ones just stop being asked for and age out
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _stamp(value):
+    return int(value.timestamp() * 1_000_000) if value else 0
+
+
+def render_cards(objects, template_name, name, key_for, load_missing=None):
+    """
+    Renders `template_name` once per object (available to it as `name`)
+    and returns the HTML in the same order. All the keys are looked up with
+    one get_many; only the misses get `load_missing(misses)` (e.g. to
+    prefetch what the template needs) and are rendered and stored.
+    """
+    keys = [key_for(obj) for obj in objects]
+    found = cache.get_many(keys)
+    missing = [(obj, key) for obj, key in zip(objects, keys) if key not in found]
+    if missing:
+        if load_missing is not None:
+            load_missing([obj for obj, _ in missing])
+        fresh = {key: render_to_string(template_name, {name: obj}) for obj, key in missing}
+        cache.set_many(fresh, CARD_CACHE_TIMEOUT)
+        found.update(fresh)
+    return [mark_safe(found[key]) for key in keys]
+
+
+def event_card_key(event, categories_generation):
+    # the event's own updated_at also moves when its categories are swapped
+    # or its series changes (events/signals.py); renaming a category bumps
+    # the generation instead. The date tells a series' occurrences apart
+    venue = event.venue
+    venue_part = f'{venue.pk}.{_stamp(venue.updated_at)}' if venue else '-'
+    return (
+        f'card:event:{event.pk}:{event.date:%Y%m%d}:{_stamp(event.updated_at)}'
+        f':v{venue_part}:c{categories_generation}'
+    )
+
+
+def event_cards(events):
+    """Cards for `events`, which need the venue loaded (select_related)."""
+    generation = get_generations(['categories'])['categories']
+    return render_cards(
+        events,
+        'partials/_event_card.html',
+        'event',
+        key_for=lambda event: event_card_key(event, generation),
+        load_missing=lambda missing: prefetch_related_objects(missing, 'categories'),
+    )
+
+
+def venue_cards(venues):
+    return render_cards(
+        venues,
+        'partials/_venue_card.html',
+        'venue',
+        key_for=lambda venue: f'card:venue:{venue.pk}:{_stamp(venue.updated_at)}',
+    )
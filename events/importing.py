@@ -0,0 +1,292 @@
+import csv
+import json
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_date, parse_time
+
+from categories.models import Category
+from venues.availability import series_slots
+from venues.models import Venue
+from . import feed
+from .cache import bump_generation
+from .calendars import ALL_CALENDARS
+from .models import ChangeLog, Event, STATUS_CHOICES
+
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+VALID_STATUSES = {value for value, _ in STATUS_CHOICES}
+
+
+class RowError(Exception):
+    pass
+
+
+def text(row, name):
+    # JSONL values can be numbers or lists as well as strings
+    value = row.get(name)
+    return '' if value is None else str(value).strip()
+
+
+def read_rows(fh, fmt):
+    """Yields (line number, dict) one row at a time, never the whole file."""
+    if fmt == 'csv':
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_no, RowError(f'invalid JSON ({exc})')
+                continue
+            if not isinstance(row, dict):
+                yield line_no, RowError('expected a JSON object')
+                continue
+            yield line_no, row
+    else:
+        raise ValueError(f'unknown format {fmt!r}, expected one of {IMPORT_FORMATS}')
+
+
+class ImportStats:
+
+    def __init__(self):
+        self.read = 0
+        self.created = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+class EventImporter:
+    """
+    Streams rows into Event with bulk_create, batch_size rows at a time.
+
+    Venues are matched by name (or pk) and categories by slug or name
+    through dicts built once up front, so a row costs no queries of its
+    own. Each batch costs one query for venue/date conflicts (and one or
+    two for the dates of recurring events at those venues), one INSERT for
+    the events and one for the category links.
+
+    Bad rows don't stop the import, they're passed to on_error(line, message).
+    """
+
+    def __init__(self, batch_size=500, on_error=None, dry_run=False):
+        self.batch_size = batch_size
+        self.on_error = on_error or (lambda line, message: None)
+        self.dry_run = dry_run
+        self.stats = ImportStats()
+        self.touched_categories = set()
+
+        self.venues = {}
+        for pk, name in Venue.objects.values_list('pk', 'name'):
+            self.venues.setdefault(name.strip().lower(), pk)
+            self.venues[str(pk)] = pk
+        self.categories = {}
+        for pk, name, slug in Category.objects.values_list('pk', 'name', 'slug'):
+            self.categories[name.strip().lower()] = pk
+            if slug:
+                self.categories[slug.lower()] = pk
+
+    def run(self, rows):
+        batch = []
+        try:
+            for line_no, row in rows:
+                self.stats.read += 1
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    batch.append((line_no, *self.parse(row)))
+                except RowError as exc:
+                    self.fail(line_no, str(exc))
+                    continue
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+        finally:
+            # also when the file turns out unreadable halfway, for the
+            # batches already in
+            if self.stats.created and not self.dry_run:
+                # bulk inserts skip the signals that normally keep these current
+                if self.touched_categories:
+                    Category.objects.refresh_event_counts(self.touched_categories)
+                bump_generation('events', ALL_CALENDARS)
+        return self.stats
+
+    def fail(self, line_no, message):
+        self.stats.failed += 1
+        self.on_error(line_no, message)
+
+    def parse(self, row):
+        try:
+            return self.parse_fields(row)
+        except (ValueError, TypeError, AttributeError, InvalidOperation) as exc:
+            # whatever the checks below didn't see coming, as one bad row
+            # rather than the end of the import
+            raise RowError(f'invalid row ({exc})')
+
+    def parse_fields(self, row):
+        title = text(row, 'title')
+        if len(title) < 3:
+            raise RowError('title must be at least 3 characters')
+        if len(title) > 200:
+            raise RowError('title is longer than 200 characters')
+
+        try:
+            event_date = parse_date(text(row, 'date'))
+        except ValueError:
+            # well formed but not a day, like 2027-02-30
+            event_date = None
+        if event_date is None:
+            raise RowError(f'invalid date {row.get("date")!r}')
+
+        event_time = None
+        if text(row, 'time'):
+            try:
+                event_time = parse_time(text(row, 'time'))
+            except ValueError:
+                event_time = None
+            if event_time is None:
+                raise RowError(f'invalid time {row["time"]!r}')
+
+        venue_id = None
+        venue_ref = text(row, 'venue')
+        if venue_ref:
+            venue_id = self.venues.get(venue_ref.lower())
+            if venue_id is None:
+                raise RowError(f'unknown venue {venue_ref!r}')
+
+        raw_categories = row.get('categories') or []
+        if isinstance(raw_categories, str):
+            # csv cells hold "music|outdoors"
+            raw_categories = raw_categories.split('|')
+        category_ids = set()
+        for ref in raw_categories:
+            ref = str(ref).strip()
+            if not ref:
+                continue
+            pk = self.categories.get(ref.lower())
+            if pk is None:
+                raise RowError(f'unknown category {ref!r}')
+            category_ids.add(pk)
+
+        try:
+            price = Decimal(text(row, 'price') or 0)
+        except InvalidOperation:
+            price = None
+        # NaN and Infinity parse, but aren't prices
+        if price is None or not price.is_finite():
+            raise RowError(f'invalid price {row.get("price")!r}')
+        if price < 0:
+            raise RowError('price cannot be negative')
+        if price >= 1000000:
+            raise RowError('price is too large')
+
+        status = (text(row, 'status') or 'draft').lower()
+        if status not in VALID_STATUSES:
+            raise RowError(f'invalid status {status!r}')
+        # same rule as the pre_save signal, which bulk_create doesn't trigger
+        if status == 'published' and event_date < date.today():
+            status = 'cancelled'
+
+        max_attendees = row.get('max_attendees')
+        if max_attendees in (None, ''):
+            max_attendees = None
+        else:
+            try:
+                max_attendees = int(max_attendees)
+            except (TypeError, ValueError):
+                raise RowError(f'invalid max_attendees {max_attendees!r}')
+            if max_attendees < 0:
+                raise RowError('max_attendees cannot be negative')
+
+        event = Event(
+            title=title,
+            description=text(row, 'description'),
+            date=event_date,
+            time=event_time,
+            venue_id=venue_id,
+            price=price,
+            status=status,
+            max_attendees=max_attendees,
+        )
+        return event, category_ids
+
+    def flush(self, batch):
+        batch = self.drop_conflicts(batch)
+        if not batch or self.dry_run:
+            self.stats.created += len(batch)
+            return
+        try:
+            with transaction.atomic():
+                self.insert(batch)
+        except IntegrityError:
+            # someone booked a slot since the conflict check, go row by row
+            # so only the clashing rows are lost
+            for item in batch:
+                try:
+                    with transaction.atomic():
+                        self.insert([item])
+                except IntegrityError:
+                    self.fail(item[0], 'venue was booked on this date while importing')
+
+    def insert(self, batch):
+        events = Event.objects.bulk_create([event for _, event, _ in batch])
+        through = Event.categories.through
+        links = []
+        for (_, _, category_ids), event in zip(batch, events):
+            links += [through(event_id=event.pk, category_id=pk) for pk in category_ids]
+        through.objects.bulk_create(links)
+        feed.add_events(events)
+        ChangeLog.objects.record(ChangeLog.EVENT, [event.pk for event in events])
+        for _, _, category_ids in batch:
+            self.touched_categories.update(category_ids)
+        self.stats.created += len(events)
+
+    def drop_conflicts(self, batch):
+        booking = [
+            item for item in batch
+            if item[1].venue_id is not None and item[1].status != 'cancelled'
+        ]
+        if not booking:
+            return batch
+
+        venue_ids = {item[1].venue_id for item in booking}
+        dates = {item[1].date for item in booking}
+        # one query for the whole batch; it may return a few extra
+        # (venue, date) pairs from the cross product, the set lookup
+        # below only cares about exact pairs
+        taken = set(
+            Event.objects.exclude(status='cancelled')
+            .filter(venue_id__in=venue_ids, date__in=dates)
+            .values_list('venue_id', 'date')
+        )
+        # the later dates of recurring events have no rows to find above
+        taken.update(series_slots(min(dates), max(dates), venue_ids))
+
+        kept = []
+        for item in batch:
+            line_no, event, _ = item
+            if event.venue_id is not None and event.status != 'cancelled':
+                slot = (event.venue_id, event.date)
+                if slot in taken:
+                    self.fail(line_no, f'venue already has an event on {event.date}')
+                    continue
+                taken.add(slot)
+            kept.append(item)
+        return kept
@@ -0,0 +1,229 @@
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from categories import api_urls as category_api_urls
+from categories import urls as category_urls
+from categories.models import Category
+from events import api_urls as event_api_urls
+from events import urls as event_urls
+from events.models import Event, Rsvp
+from events.recurrence import occurrences, with_rules
+from venues import api_urls as venue_api_urls
+from venues import urls as venue_urls
+from venues.models import Venue
+
+
+# which model's pk fills in <int:pk> for each urls module
+URL_MODULES = [
+    (event_urls, Event),
+    (venue_urls, Venue),
+    (category_urls, Category),
+    (event_api_urls, Event),
+    (venue_api_urls, Venue),
+    (category_api_urls, Category),
+]
+
+# extra query strings worth timing on their own, they hit different code paths
+VARIANTS = {
+    'event_list': ['?sort=title', '?sort=price_high', '?search=music', '?search=jazz+night&sort=date'],
+    'api_event_list': ['?sort=title', '?sort=price_high', '?search=music', '?search=jazz+night&sort=date'],
+    'api_venue_calendar': ['?format=bitmap', f'?end={date.today() + timedelta(days=365)}'],
+}
+
+# pages that need some parameters to do anything but return a 400
+BASE_QUERIES = {
+    'api_venue_free': f'?date={date.today() + timedelta(days=7)}&capacity=100',
+}
+
+# JSON endpoints and the HTML page serving the same data; the report puts
+# the HTML numbers next to the API ones for the same query string
+HTML_COUNTERPARTS = {
+    'api_event_list': 'event_list',
+    'api_event_detail': 'event_detail',
+    'api_venue_list': 'venue_list',
+    'api_venue_detail': 'venue_detail',
+    'api_category_list': 'category_list',
+}
+
+
+def _rsvp_cancel_sample():
+    token = Rsvp.objects.order_by('pk').values_list('token', flat=True).first()
+    return None if token is None else {'token': token}
+
+
+def _occurrence_skip_sample():
+    # the first later date of the first recurring event
+    for event in with_rules(Event.objects.all()).order_by('pk')[:1]:
+        occurrence = next(occurrences(event), None)
+        if occurrence is not None:
+            return {'pk': event.pk, 'day': occurrence.date.isoformat()}
+    return None
+
+
+def _category_calendar_sample():
+    slug = Category.objects.order_by('pk').values_list('slug', flat=True).first()
+    return None if slug is None else {'slug': slug}
+
+
+# routes with arguments other than a pk: url name -> a function returning
+# the kwargs of a sample, or None when there is nothing to sample
+SAMPLE_KWARGS = {
+    'rsvp_cancel': _rsvp_cancel_sample,
+    'occurrence_skip': _occurrence_skip_sample,
+    'category_calendar': _category_calendar_sample,
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Requests every page from events/, venues/ and categories/ urls through the test '
+        'client and reports latency percentiles and query counts as JSON. Exits with an '
+        'error when a budget is exceeded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per URL.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per URL first.')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--only', nargs='*', help='Only these url names.')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+        parser.add_argument(
+            '--budget',
+            help='JSON file of {"<url name or *>": {"max_queries": N, "p95_ms": N}}.',
+        )
+        parser.add_argument('--max-queries', type=int, help='Budget for every URL: most queries per request.')
+        parser.add_argument('--max-p95-ms', type=float, help='Budget for every URL: p95 latency in ms.')
+
+    def handle(self, *args, **options):
+        client = Client()
+        report = {}
+        for name, url, variant in self.targets(options['only']):
+            report[url] = self.measure(client, name, url, options)
+            report[url]['variant'] = variant
+        self.compare_with_html(report)
+
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+        else:
+            self.stdout.write(text)
+
+        failures = self.check_budgets(report, self.load_budgets(options))
+        if failures:
+            raise CommandError('Budget exceeded:\n  ' + '\n  '.join(failures))
+
+    def targets(self, only=None):
+        for module, model in URL_MODULES:
+            sample = model.objects.order_by('pk').first()
+            for pattern in module.urlpatterns:
+                name = pattern.name
+                if only and name not in only:
+                    continue
+                converters = set(pattern.pattern.converters)
+                if name in SAMPLE_KWARGS:
+                    kwargs = SAMPLE_KWARGS[name]()
+                    if kwargs is None:
+                        self.stderr.write(f'skipping {name}: nothing to sample')
+                        continue
+                    url = reverse(name, kwargs=kwargs)
+                elif converters == {'pk'}:
+                    if sample is None:
+                        self.stderr.write(f'skipping {name}: no {model.__name__} rows')
+                        continue
+                    url = reverse(name, kwargs={'pk': sample.pk})
+                elif converters:
+                    # a new route with arguments needs an entry in SAMPLE_KWARGS
+                    self.stderr.write(f'skipping {name}: no sample for {", ".join(sorted(converters))}')
+                    continue
+                else:
+                    url = reverse(name) + BASE_QUERIES.get(name, '')
+                yield name, url, ''
+                for query in VARIANTS.get(name, []):
+                    yield name, url + query, query
+
+    def measure(self, client, name, url, options):
+        for _ in range(options['warmup']):
+            client.get(url)
+
+        latencies, query_counts = [], []
+        status = None
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(ctx.captured_queries))
+            status = response.status_code
+
+        latencies.sort()
+        return {
+            'name': name,
+            'status': status,
+            'requests': len(latencies),
+            'queries_max': max(query_counts),
+            'queries_mean': round(statistics.mean(query_counts), 2),
+            'ms_mean': round(statistics.mean(latencies), 2),
+            'ms_p50': round(percentile(latencies, 50), 2),
+            'ms_p90': round(percentile(latencies, 90), 2),
+            'ms_p95': round(percentile(latencies, 95), 2),
+            'ms_p99': round(percentile(latencies, 99), 2),
+            'ms_max': round(latencies[-1], 2),
+        }
+
+    def compare_with_html(self, report):
+        by_variant = {(result['name'], result['variant']): (url, result) for url, result in report.items()}
+        for result in report.values():
+            counterpart = HTML_COUNTERPARTS.get(result['name'])
+            if (counterpart, result['variant']) not in by_variant:
+                continue
+            html_url, html = by_variant[(counterpart, result['variant'])]
+            result['vs_html'] = {
+                'url': html_url,
+                'queries_max': html['queries_max'],
+                'ms_p50': html['ms_p50'],
+                'ms_p95': html['ms_p95'],
+                'speedup_p50': round(html['ms_p50'] / result['ms_p50'], 2) if result['ms_p50'] else None,
+            }
+
+    def load_budgets(self, options):
+        budgets = {}
+        if options['budget']:
+            with open(options['budget']) as fh:
+                budgets = json.load(fh)
+        default = budgets.setdefault('*', {})
+        if options['max_queries'] is not None:
+            default['max_queries'] = options['max_queries']
+        if options['max_p95_ms'] is not None:
+            default['p95_ms'] = options['max_p95_ms']
+        return budgets
+
+    def check_budgets(self, report, budgets):
+        failures = []
+        for url, result in report.items():
+            budget = {**budgets.get('*', {}), **budgets.get(result['name'], {})}
+            if result['status'] >= 500:
+                failures.append(f'{url}: status {result["status"]}')
+            if 'max_queries' in budget and result['queries_max'] > budget['max_queries']:
+                failures.append(f'{url}: {result["queries_max"]} queries > {budget["max_queries"]}')
+            if 'p95_ms' in budget and result['ms_p95'] > budget['p95_ms']:
+                failures.append(f'{url}: p95 {result["ms_p95"]}ms > {budget["p95_ms"]}ms')
+        return failures
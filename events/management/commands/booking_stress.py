@@ -0,0 +1,105 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections
+
+from events.forms import EventForm
+from events.models import Event, VENUE_CONFLICT_MESSAGE
+from venues.models import Venue
+
+
+class Command(BaseCommand):
+    help = (
+        'Races several threads booking the same venue on the same date through '
+        'EventForm.save_booking(), all of them past validation before any saves, '
+        'and checks exactly one gets the booking and the rest are shown '
+        'VENUE_CONFLICT_MESSAGE. Run it against Postgres to see the constraint '
+        'settle the race rather than SQLite\'s single writer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--rounds', type=int, default=10, help='Races, each on a new date.')
+        parser.add_argument('--keep', action='store_true', help='Leave the test venue and its events in the database.')
+
+    def handle(self, *args, **options):
+        venue = Venue.objects.create(name='Booking stress test', address='-', city='-')
+        problems = []
+        began = time.perf_counter()
+        try:
+            for n in range(options['rounds']):
+                day = date.today() + timedelta(days=365 + n)
+                problems += [f'round {n}: {problem}' for problem in self.race(venue, day, options['threads'])]
+            elapsed = time.perf_counter() - began
+            booked = Event.objects.filter(venue=venue).exclude(status='cancelled').count()
+            self.stdout.write(
+                f'{options["rounds"]} rounds x {options["threads"]} threads in {elapsed:.1f}s: {booked} bookings'
+            )
+        finally:
+            if not options['keep']:
+                Event.objects.filter(venue=venue).delete()
+                venue.delete()
+
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('OK'))
+
+    def race(self, venue, day, threads):
+        # validate everywhere first, so the losers only find out at the INSERT
+        validated = threading.Barrier(threads)
+        results = [None] * threads
+
+        def worker(n):
+            try:
+                form = EventForm({
+                    'title': f'Booking stress {n}',
+                    'date': day.isoformat(),
+                    'venue': venue.pk,
+                    'price': '0',
+                    'status': 'published',
+                })
+                valid = form.is_valid()
+                validated.wait()
+                if not valid:
+                    results[n] = ('invalid', form.errors.as_data())
+                    return
+                for _ in range(20):
+                    # SQLite answers contention with "database is locked"
+                    try:
+                        event = form.save_booking()
+                        break
+                    except OperationalError:
+                        time.sleep(0.01)
+                else:
+                    results[n] = ('error', 'database stayed locked')
+                    return
+                if event is not None:
+                    results[n] = ('booked', event.pk)
+                elif VENUE_CONFLICT_MESSAGE in form.non_field_errors():
+                    results[n] = ('conflict', None)
+                else:
+                    results[n] = ('invalid', form.errors.as_data())
+            except Exception as e:
+                # don't leave the others waiting at the barrier
+                validated.abort()
+                results[n] = ('error', repr(e))
+            finally:
+                close_old_connections()
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        problems = [f'thread {n}: {outcome} {detail}' for n, (outcome, detail) in enumerate(results)
+                    if outcome not in ('booked', 'conflict')]
+        winners = sum(1 for outcome, _ in results if outcome == 'booked')
+        if winners != 1:
+            problems.append(f'{winners} threads booked {day}')
+        stored = Event.objects.filter(venue=venue, date=day).exclude(status='cancelled').count()
+        if stored != 1:
+            problems.append(f'{stored} bookings stored for {day}')
+        return problems
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from events.cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss counters for the cached pages (home, categories).'
+
+    def handle(self, *args, **options):
+        for page, counts in cache_stats().items():
+            total = counts['hits'] + counts['misses']
+            ratio = counts['hits'] / total * 100 if total else 0
+            self.stdout.write(
+                f"{page:<15} hits {counts['hits']:>8}  misses {counts['misses']:>8}  hit rate {ratio:5.1f}%"
+            )
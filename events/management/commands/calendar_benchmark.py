@@ -0,0 +1,103 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from categories.models import Category
+from events.calendars import calendar_events, invalidate_calendars
+from venues.models import Venue
+
+
+class Command(BaseCommand):
+    help = (
+        'Polls the .ics feed of the busiest venue and category the way calendar apps '
+        'do: a cold build, plain polls served from the cache, conditional polls '
+        '(If-None-Match, answered 304) and the rebuild after one event changed. '
+        'Requests go straight to the WSGI handler, middleware and all, as a server '
+        'would send them. Reports polls per second and queries per poll.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polls', type=int, default=2000, help='Polls timed for each case.')
+        parser.add_argument('--json', action='store_true', help='Print the raw JSON result.')
+
+    def handle(self, *args, **options):
+        events = calendar_events()
+        venue = Venue.objects.filter(events__in=events).annotate(n=Count('events')).order_by('-n').first()
+        category = Category.objects.filter(events__in=events).annotate(n=Count('events')).order_by('-n').first()
+        if venue is None or category is None:
+            raise CommandError('No events to put in a feed, run seed_data first.')
+
+        feeds = {
+            'venue': (reverse('venue_calendar', args=[venue.pk]), {'venue_ids': [venue.pk]}),
+            'category': (reverse('category_calendar', args=[category.slug]), {'category_ids': [category.pk]}),
+        }
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        result = {'polls': options['polls']}
+        for kind, (url, changed) in feeds.items():
+            def get(environ):
+                status = []
+                body = b''.join(handler(environ, lambda line, headers: status.append((line, dict(headers)))))
+                line, headers = status[0]
+                return int(line.split()[0]), headers, body
+
+            def poll(headers=None):
+                environ = factory.get(url, headers=headers).environ
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = get(environ)
+                    ms = (time.perf_counter() - started) * 1000
+                return response, ms, len(captured.captured_queries)
+
+            def rate(headers=None, expect=200):
+                environ = factory.get(url, headers=headers).environ
+                started = time.perf_counter()
+                for _ in range(options['polls']):
+                    status, _, _ = get(environ)
+                    if status != expect:
+                        raise CommandError(f'{url} answered {status}, expected {expect}')
+                polls_per_second = options['polls'] / (time.perf_counter() - started)
+                _, _, queries = poll(headers)
+                return {'polls_per_second': round(polls_per_second), 'queries': queries}
+
+            # a save of one of its events bumps the feed like this
+            invalidate_calendars(**changed)
+            (_, headers, body), cold_ms, cold_queries = poll()
+            etag = headers['ETag']
+            entry = {
+                'url': url,
+                'bytes': len(body),
+                'cold': {'ms': round(cold_ms, 2), 'queries': cold_queries},
+                'cached': rate(),
+                'not_modified': rate({'If-None-Match': etag}, 304),
+            }
+            invalidate_calendars(**changed)
+            (status, _, _), ms, queries = poll({'If-None-Match': etag})
+            entry['rebuilt'] = {'ms': round(ms, 2), 'queries': queries, 'status': status}
+            result[kind] = entry
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        for kind in feeds:
+            r = result[kind]
+            self.stdout.write(f'{kind} feed {r["url"]} ({r["bytes"]} bytes)')
+            self.stdout.write(f'  cold build     {r["cold"]["ms"]:>9} ms  {r["cold"]["queries"]} queries')
+            self.stdout.write(
+                f'  cached 200     {r["cached"]["polls_per_second"]:>9} polls/s  {r["cached"]["queries"]} queries'
+            )
+            self.stdout.write(
+                f'  304            {r["not_modified"]["polls_per_second"]:>9} polls/s  '
+                f'{r["not_modified"]["queries"]} queries'
+            )
+            self.stdout.write(
+                f'  rebuilt        {r["rebuilt"]["ms"]:>9} ms  {r["rebuilt"]["queries"]} queries '
+                f'({r["rebuilt"]["status"]})'
+            )
@@ -0,0 +1,80 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from events.cache import get_generations
+from events.fragments import event_card_key, event_cards
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        'Times rendering a page of event cards: every card rendered from scratch, '
+        'cold (cache empty for those cards), warm (all cached) and warm after one '
+        'event changed. Reports the median ms and queries of each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=500, help='Cards on the page.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs of each case.')
+        parser.add_argument('--json', action='store_true', help='Print the raw JSON result.')
+
+    def handle(self, *args, **options):
+        ids = list(Event.objects.order_by('date', 'pk').values_list('pk', flat=True)[:options['cards']])
+        if not ids:
+            raise CommandError('No events, run seed_data first.')
+
+        def load():
+            # fresh instances every run, so no prefetched categories carry over
+            return list(Event.objects.select_related('venue').filter(pk__in=ids).order_by('date', 'pk'))
+
+        def uncached(events):
+            prefetch_related_objects(events, 'categories')
+            return [render_to_string('partials/_event_card.html', {'event': event}) for event in events]
+
+        def forget(events):
+            generation = get_generations(['categories'])['categories']
+            cache.delete_many([event_card_key(event, generation) for event in events])
+
+        def one_edited(events):
+            # what the next request sees after one event was saved
+            events[len(events) // 2].updated_at = timezone.now()
+
+        cases = {
+            'uncached': (uncached, None),
+            'cold': (event_cards, forget),
+            'warm': (event_cards, None),
+            'one_edited': (event_cards, one_edited),
+        }
+        # make sure 'warm' starts warm
+        event_cards(load())
+
+        result = {'cards': len(ids)}
+        for name, (render, before) in cases.items():
+            timings, queries = [], []
+            for _ in range(options['repeat']):
+                events = load()
+                if before is not None:
+                    before(events)
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    render(events)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured.captured_queries))
+            result[name] = {'ms': round(statistics.median(timings), 2), 'queries': max(queries)}
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(f'{result["cards"]} cards')
+        for name in cases:
+            r = result[name]
+            self.stdout.write(f'{name:<11} {r["ms"]:>9} ms  {r["queries"]} queries')
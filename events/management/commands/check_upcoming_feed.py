@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from events import feed
+
+
+class Command(BaseCommand):
+    help = 'Compares the precomputed upcoming-events feed with the live query and reports any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rebuild the feed if it has drifted.')
+
+    def handle(self, *args, **options):
+        missing, extra, stale = feed.compare_with_live()
+        for label, ids in (('missing', missing), ('extra', extra), ('stale', stale)):
+            if ids:
+                shown = ', '.join(map(str, ids[:20])) + (' ...' if len(ids) > 20 else '')
+                self.stdout.write(f'{len(ids)} {label}: {shown}')
+
+        if not (missing or extra or stale):
+            self.stdout.write(self.style.SUCCESS('Upcoming feed matches the live query.'))
+            return
+
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING('Upcoming feed is out of sync, run with --fix to rebuild it.'))
+            return
+
+        count = feed.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the upcoming feed with {count} event(s).'))
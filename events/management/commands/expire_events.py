@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from events.expiry import sweep_expired_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancels published events whose date has passed, all in one UPDATE. '
+        'Run it from cron (e.g. a few minutes after midnight) or leave it running with --loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, sweeping every --interval seconds.')
+        parser.add_argument('--interval', type=int, default=300, help='Seconds between sweeps with --loop.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be cancelled.')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.sweep(options['dry_run'])
+            return
+
+        try:
+            while True:
+                # long-running process: don't hang on to a connection the
+                # database may have closed since the last sweep
+                close_old_connections()
+                self.sweep(options['dry_run'])
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def sweep(self, dry_run):
+        started = time.perf_counter()
+        sweep = sweep_expired_events(dry_run=dry_run)
+        elapsed = (time.perf_counter() - started) * 1000
+        if sweep is None:
+            self.stdout.write(f'Nothing to expire ({elapsed:.0f} ms).')
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'Would cancel {sweep.expired_count} event(s) dated before {sweep.cutoff}.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Cancelled {sweep.expired_count} event(s) dated before {sweep.cutoff} ({elapsed:.0f} ms).'
+            ))
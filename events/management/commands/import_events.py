@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.importing import IMPORT_FORMATS, EventImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports events from a CSV or JSONL file (or - for stdin) in batches. '
+        'Columns: title, description, date, time, venue, categories, price, status, max_attendees. '
+        'venue is a venue name or id, categories are slugs or names separated by | in CSV '
+        'or a list in JSONL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and check conflicts, insert nothing.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError(f'Cannot tell the format of {path!r}, pass --format.')
+
+        def report(line_no, message):
+            self.stderr.write(f'line {line_no}: {message}')
+
+        importer = EventImporter(
+            batch_size=options['batch_size'],
+            on_error=report,
+            dry_run=options['dry_run'],
+        )
+
+        if path == '-':
+            stats = importer.run(read_rows(sys.stdin, fmt))
+        else:
+            try:
+                fh = open(path, newline='', encoding='utf-8-sig')
+            except OSError as exc:
+                raise CommandError(str(exc))
+            with fh:
+                stats = importer.run(read_rows(fh, fmt))
+
+        verb = 'would be created' if options['dry_run'] else 'created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats.read} rows read, {stats.created} events {verb}, {stats.failed} failed '
+            f'in {stats.elapsed:.2f}s ({stats.rows_per_second:.0f} rows/s).'
+        ))
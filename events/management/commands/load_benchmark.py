@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from events.management.commands.benchmark import percentile
+from events.models import Event
+from venues.models import Venue
+
+
+# the pages that have async versions (see events/async_views.py)
+READ_VIEWS = ['home', 'event_list', 'event_detail', 'venue_detail', 'category_list']
+
+
+class Command(BaseCommand):
+    help = (
+        'Throughput of the read pages under concurrent load, sync views on a thread pool '
+        '(like a threaded WSGI server) against async views on one event loop (ASGI). '
+        'With --stack both (the default) each stack runs in its own process and the '
+        'results are compared.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stack', choices=['sync', 'async', 'both'], default='both')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=1000, help='Total requests, spread over the pages.')
+        parser.add_argument('--only', nargs='*', choices=READ_VIEWS, help='Only these pages.')
+        parser.add_argument('--json', action='store_true', help='Print the raw JSON result.')
+
+    def handle(self, *args, **options):
+        if options['stack'] == 'both':
+            results = {stack: self.run_in_subprocess(stack, options) for stack in ('sync', 'async')}
+            self.report(results, options['json'])
+            return
+
+        is_async = options['stack'] == 'async'
+        if settings.ASYNC_READ_VIEWS != is_async:
+            raise CommandError(
+                f'--stack {options["stack"]} needs ASYNC_READ_VIEWS = {is_async} '
+                f'(set EVENT_MANAGER_ASYNC_VIEWS={"1" if is_async else "0"}), or use --stack both.'
+            )
+        urls = self.urls(options['only'] or READ_VIEWS)
+        # warm the caches and connections so both stacks start equal
+        client = Client()
+        for url in urls:
+            client.get(url)
+
+        started = time.perf_counter()
+        if is_async:
+            latencies, errors = asyncio.run(self.run_async(urls, options['requests'], options['concurrency']))
+        else:
+            latencies, errors = self.run_sync(urls, options['requests'], options['concurrency'])
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        result = {
+            'stack': options['stack'],
+            'concurrency': options['concurrency'],
+            'requests': len(latencies),
+            'errors': errors,
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'ms_mean': round(statistics.mean(latencies), 2),
+            'ms_p50': round(percentile(latencies, 50), 2),
+            'ms_p95': round(percentile(latencies, 95), 2),
+            'ms_p99': round(percentile(latencies, 99), 2),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.report({options['stack']: result}, False)
+
+    def urls(self, names):
+        event = Event.objects.order_by('pk').first()
+        venue = Venue.objects.order_by('pk').first()
+        samples = {'event_detail': event, 'venue_detail': venue}
+        urls = []
+        for name in names:
+            if name in samples:
+                if samples[name] is None:
+                    self.stderr.write(f'skipping {name}: no rows to show')
+                    continue
+                urls.append(reverse(name, kwargs={'pk': samples[name].pk}))
+            else:
+                urls.append(reverse(name))
+        if not urls:
+            raise CommandError('Nothing to request, run seed_data first.')
+        return urls
+
+    def run_sync(self, urls, total, concurrency):
+        local = threading.local()
+        lock = threading.Lock()
+        latencies, errors = [], [0]
+
+        def one(i):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            start = time.perf_counter()
+            response = client.get(urls[i % len(urls)])
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors[0] += 1
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(total)))
+        return latencies, errors[0]
+
+    async def run_async(self, urls, total, concurrency):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+        latencies, errors = [], 0
+
+        async def one(i):
+            nonlocal errors
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(urls[i % len(urls)])
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+        return latencies, errors
+
+    def run_in_subprocess(self, stack, options):
+        # the url conf picks its views at import time, so each stack gets a fresh process
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+            EVENT_MANAGER_ASYNC_VIEWS='1' if stack == 'async' else '0',
+        )
+        command = [
+            sys.executable, sys.argv[0], 'load_benchmark', '--json', '--stack', stack,
+            '--concurrency', str(options['concurrency']), '--requests', str(options['requests']),
+        ]
+        if options['only']:
+            command += ['--only', *options['only']]
+        done = subprocess.run(command, env=env, capture_output=True, text=True)
+        if done.returncode != 0:
+            raise CommandError(f'{stack} run failed:\n{done.stderr}')
+        return json.loads(done.stdout.strip().splitlines()[-1])
+
+    def report(self, results, as_json):
+        if as_json:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for stack, r in results.items():
+            self.stdout.write(
+                f"{stack:<6} {r['requests_per_second']:>8} req/s  p50 {r['ms_p50']:>8} ms  "
+                f"p95 {r['ms_p95']:>8} ms  p99 {r['ms_p99']:>8} ms  errors {r['errors']} "
+                f"({r['requests']} requests, concurrency {r['concurrency']})"
+            )
+        if 'sync' in results and 'async' in results:
+            ratio = results['async']['requests_per_second'] / results['sync']['requests_per_second']
+            self.stdout.write(f'async/sync throughput: {ratio:.2f}x')
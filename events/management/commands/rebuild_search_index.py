@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from events.search import backend_for_vendor
+
+
+class Command(BaseCommand):
+    help = 'Recreates the full-text search index, triggers included, and reindexes every event.'
+
+    def handle(self, *args, **options):
+        backend = backend_for_vendor(connection.vendor)
+        backend.install(connection)
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({type(backend).__name__}).'))
@@ -0,0 +1,42 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from event_manager.db_router import replica_aliases
+
+
+def sqlite_path(name):
+    # 'file:/path/db.sqlite3?mode=ro' -> '/path/db.sqlite3'
+    name = str(name)
+    if name.startswith('file:'):
+        name = name[len('file:'):].split('?', 1)[0]
+    return name
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies the SQLite primary database over each SQLite replica in DATABASE_REPLICAS '
+        '(see event_manager/settings_replicas.py), standing in for replication.'
+    )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Only for SQLite; real replicas are kept up to date by the database.')
+        if not replica_aliases():
+            raise CommandError('DATABASE_REPLICAS is empty, try --settings=event_manager.settings_replicas.')
+
+        source = sqlite3.connect(sqlite_path(primary['NAME']))
+        try:
+            for alias in replica_aliases():
+                path = sqlite_path(settings.DATABASES[alias]['NAME'])
+                target = sqlite3.connect(path)
+                try:
+                    # the backup API copies a consistent snapshot, even mid-write
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f'{alias}: refreshed {path}'))
+        finally:
+            source.close()
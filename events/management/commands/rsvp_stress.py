@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections
+
+from events.models import Event, Rsvp
+from events.rsvp import cancel_rsvp, rsvp
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammers one throwaway event with concurrent RSVPs and cancellations from '
+        'several threads, then checks nobody got a seat that does not exist: going '
+        'RSVPs <= max_attendees, attendee_count == going RSVPs, and no one left '
+        'waiting while a seat is free. Run it against Postgres to see real row locks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=50, help='RSVPs per thread.')
+        parser.add_argument('--capacity', type=int, default=20)
+        parser.add_argument('--cancel-rate', type=float, default=0.3, help='Chance a thread cancels right after an RSVP.')
+        parser.add_argument('--keep', action='store_true', help='Leave the test event in the database.')
+
+    def handle(self, *args, **options):
+        event = Event.objects.create(
+            title='RSVP stress test',
+            date=date.today() + timedelta(days=365),
+            status='published',
+            max_attendees=options['capacity'],
+        )
+        start = threading.Barrier(options['threads'])
+        errors = []
+
+        def worker(n):
+            rng = random.Random(n)
+            start.wait()
+            try:
+                for i in range(options['attempts']):
+                    for _ in range(20):
+                        # SQLite answers contention with "database is locked"
+                        try:
+                            entry, _ = rsvp(event, f'Worker {n}', f'worker{n}-{i}@example.com')
+                            if rng.random() < options['cancel_rate']:
+                                cancel_rsvp(entry)
+                            break
+                        except OperationalError:
+                            time.sleep(0.01)
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                close_old_connections()
+
+        began = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        try:
+            event.refresh_from_db()
+            counts = {status: event.rsvps.filter(status=status).count() for status, _ in Rsvp.STATUS_CHOICES}
+            self.stdout.write(
+                f'{options["threads"]} threads x {options["attempts"]} RSVPs in {elapsed:.1f}s: '
+                f'{counts[Rsvp.GOING]} going, {counts[Rsvp.WAITLIST]} waiting, '
+                f'{counts[Rsvp.CANCELLED]} cancelled, attendee_count {event.attendee_count}'
+            )
+            problems = list(errors)
+            if counts[Rsvp.GOING] > event.max_attendees:
+                problems.append(f'{counts[Rsvp.GOING]} going for {event.max_attendees} seats')
+            if event.attendee_count != counts[Rsvp.GOING]:
+                problems.append(f'attendee_count {event.attendee_count} != {counts[Rsvp.GOING]} going')
+            if counts[Rsvp.WAITLIST] and counts[Rsvp.GOING] < event.max_attendees:
+                problems.append('people are waiting while seats are free')
+        finally:
+            if not options['keep']:
+                event.delete()
+
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('OK'))
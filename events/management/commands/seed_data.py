@@ -0,0 +1,163 @@
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import slugify
+
+from categories.models import Category
+from events import feed
+from events.cache import bump_generation
+from events.calendars import ALL_CALENDARS
+from events.models import ChangeLog, Event
+from venues.models import Venue
+
+
+CITIES = ['Sofia', 'Plovdiv', 'Varna', 'Burgas', 'Ruse', 'Stara Zagora', 'Pleven', 'Veliko Tarnovo']
+VENUE_KINDS = ['Hall', 'Club', 'Park', 'Theatre', 'Gallery', 'Arena', 'Square', 'Bar', 'Library', 'Stage']
+CATEGORY_NAMES = [
+    'Music', 'Theatre', 'Food', 'Art', 'Sports', 'Kids', 'Tech', 'Film', 'Dance', 'Books',
+    'Markets', 'Comedy', 'Wellness', 'Outdoors', 'Workshops', 'Festivals', 'Charity', 'History',
+]
+TITLE_WORDS = [
+    'Night', 'Festival', 'Market', 'Quiz', 'Jazz', 'Open Air', 'Workshop', 'Meetup', 'Concert',
+    'Screening', 'Fair', 'Tour', 'Session', 'Showcase', 'Party', 'Talk', 'Run', 'Exhibition',
+]
+WORDS = (
+    'community local live music food drinks family friendly outdoor indoor free tickets '
+    'artists guests evening morning weekend celebration craft street summer winter open'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Fills the database with fake venues, categories and events, using bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--venues', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--days-back', type=int, default=3 * 365, help='How far into the past events go.')
+        parser.add_argument('--days-ahead', type=int, default=365, help='How far into the future events go.')
+        parser.add_argument('--max-categories', type=int, default=3, help='Most categories on one event.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, same seed = same data.')
+        parser.add_argument('--clear', action='store_true', help='Delete existing events, venues and categories first.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            if options['clear']:
+                Event.objects.all().delete()
+                Venue.objects.all().delete()
+                Category.objects.all().delete()
+
+            venues = self.make_venues(rng, options['venues'], batch_size)
+            categories = self.make_categories(rng, options['categories'], batch_size)
+            created = self.make_events(rng, venues, categories, options, batch_size)
+
+            # bulk_create skips save() and the signals, so do their work here
+            Category.objects.refresh_event_counts()
+            feed.rebuild()
+        bump_generation('events', 'venues', 'categories', ALL_CALENDARS)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(venues)} venues and {created} events across {len(categories)} categories.'
+        ))
+
+    def make_venues(self, rng, count, batch_size):
+        venues = []
+        for i in range(count):
+            city = rng.choice(CITIES)
+            venues.append(Venue(
+                name=f'{rng.choice(WORDS).title()} {rng.choice(VENUE_KINDS)} {i}',
+                address=f'{rng.randint(1, 200)} {rng.choice(WORDS).title()} St.',
+                city=city,
+                # mostly small places, a handful of big ones
+                capacity=min(int(rng.lognormvariate(5, 1.2)), 50000),
+                phone=f'+359 {rng.randint(100, 999)} {rng.randint(100000, 999999)}',
+            ))
+        venues = Venue.objects.bulk_create(venues, batch_size=batch_size)
+        ChangeLog.objects.record(ChangeLog.VENUE, [venue.pk for venue in venues])
+        return venues
+
+    def make_categories(self, rng, count, batch_size):
+        names = CATEGORY_NAMES[:count]
+        names += [f'Category {i}' for i in range(len(names), count)]
+        existing = set(Category.objects.values_list('slug', flat=True))
+        categories = []
+        for name in names:
+            cat = Category(name=name, description=f'{name} events around town.')
+            # bulk_create doesn't call save(), which is where the slug is set
+            cat.slug = slugify(name)
+            if cat.slug not in existing:
+                categories.append(cat)
+        Category.objects.bulk_create(categories, batch_size=batch_size)
+        ChangeLog.objects.record(ChangeLog.CATEGORY, [cat.pk for cat in categories])
+        # events get spread over the old categories too, not just the new ones
+        return list(Category.objects.order_by('pk'))
+
+    def make_events(self, rng, venues, categories, options, batch_size):
+        today = date.today()
+        days_back, days_ahead = options['days_back'], options['days_ahead']
+        # a few categories are much more popular than the rest
+        weights = [1 / (i + 1) for i in range(len(categories))]
+        # (venue, date) must stay unique for non-cancelled events
+        taken = set(
+            Event.objects.exclude(status='cancelled')
+            .filter(venue__isnull=False)
+            .values_list('venue_id', 'date')
+        )
+        through = Event.categories.through
+
+        created = 0
+        remaining = options['events']
+        while remaining > 0:
+            batch = []
+            for _ in range(min(batch_size, remaining)):
+                event_date = today + timedelta(days=rng.randint(-days_back, days_ahead))
+                status = self.pick_status(rng, event_date < today)
+                venue = rng.choice(venues) if venues and rng.random() < 0.95 else None
+                if venue is not None and status != 'cancelled':
+                    if (venue.pk, event_date) in taken:
+                        venue = None
+                    else:
+                        taken.add((venue.pk, event_date))
+                batch.append(Event(
+                    title=f'{rng.choice(WORDS).title()} {rng.choice(TITLE_WORDS)}',
+                    description=' '.join(rng.choices(WORDS, k=rng.randint(8, 40))).capitalize() + '.',
+                    date=event_date,
+                    time=time(rng.choice([10, 12, 16, 18, 19, 20, 21]), rng.choice([0, 30])) if rng.random() < 0.9 else None,
+                    venue=venue,
+                    price=Decimal(0) if rng.random() < 0.3 else Decimal(rng.randint(5, 150)),
+                    status=status,
+                    max_attendees=rng.choice([None, 50, 100, 200, 500, 1000]),
+                ))
+            batch = Event.objects.bulk_create(batch, batch_size=batch_size)
+
+            links = []
+            if categories:
+                for event in batch:
+                    k = rng.randint(0, min(options['max_categories'], len(categories)))
+                    picked = set()
+                    while len(picked) < k:
+                        picked.add(rng.choices(categories, weights=weights)[0].pk)
+                    links += [through(event_id=event.pk, category_id=pk) for pk in picked]
+            through.objects.bulk_create(links, batch_size=batch_size)
+            ChangeLog.objects.record(ChangeLog.EVENT, [event.pk for event in batch])
+
+            created += len(batch)
+            remaining -= len(batch)
+            self.stdout.write(f'  {created} events...')
+        return created
+
+    def pick_status(self, rng, is_past):
+        roll = rng.random()
+        if is_past:
+            # past events can't stay published (see events/signals.py)
+            return 'cancelled' if roll < 0.9 else 'draft'
+        if roll < 0.8:
+            return 'published'
+        return 'draft' if roll < 0.95 else 'cancelled'
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from events.search import backend_for_vendor
+
+
+# the search index lives outside the model (tsvector column + GIN index on
+# PostgreSQL, an FTS5 table on SQLite) so it's managed with raw SQL
+def install_search_index(apps, schema_editor):
+    backend_for_vendor(schema_editor.connection.vendor).install(schema_editor.connection)
+
+
+def remove_search_index(apps, schema_editor):
+    backend_for_vendor(schema_editor.connection.vendor).uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_status_max_attendees'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+from events.search import backend_for_vendor
+
+
+def reinstall_sqlite_search_triggers(apps, schema_editor):
+    # dropping the old constraint makes sqlite rebuild events_event,
+    # which takes the FTS triggers with it
+    if schema_editor.connection.vendor == 'sqlite':
+        backend_for_vendor('sqlite').install(schema_editor.connection)
+
+
+def check_double_bookings(apps, schema_editor):
+    # the old rule allowed one event per venue, date and time; stop with a
+    # list rather than fail on AddConstraint with no hint which rows clash
+    Event = apps.get_model('events', 'Event')
+    active = Event.objects.exclude(status='cancelled').filter(venue__isnull=False)
+    clashes = list(
+        active.values('venue_id', 'date').annotate(n=Count('pk')).filter(n__gt=1).order_by('date', 'venue_id')
+    )
+    if not clashes:
+        return
+    lines = []
+    for clash in clashes[:20]:
+        ids = active.filter(venue_id=clash['venue_id'], date=clash['date']).order_by('pk').values_list('pk', flat=True)
+        lines.append(f"  venue {clash['venue_id']} on {clash['date']}: events {', '.join(map(str, ids))}")
+    if len(clashes) > 20:
+        lines.append(f'  and {len(clashes) - 20} more')
+    raise RuntimeError(
+        'Venues can only have one event a day from here on, but these are double booked:\n'
+        + '\n'.join(lines)
+        + '\nMove or cancel all but one event of each, then migrate again.'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_venue_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_double_bookings, migrations.RunPython.noop),
+        # superseded by the stricter (venue, date) rule below
+        migrations.RemoveConstraint(
+            model_name='event',
+            name='unique_event_slot_per_venue',
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('status', 'cancelled'), _negated=True),
+                fields=('venue', 'date'),
+                name='unique_active_event_per_venue_date',
+                violation_error_message='That venue already has an event on this date.',
+            ),
+        ),
+        migrations.RunPython(reinstall_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from datetime import date
+
+from django.db import migrations, models
+
+
+def fill_feed(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    UpcomingEvent = apps.get_model('events', 'UpcomingEvent')
+    rows = Event.objects.filter(status='published', date__gte=date.today()).values_list('pk', 'date', 'time')
+    UpcomingEvent.objects.bulk_create(
+        [UpcomingEvent(event_id=pk, date=d, time=t) for pk, d, t in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_status_date_idx_expirysweep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpcomingEvent',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_entry', serialize=False, to='events.event')),
+                ('date', models.DateField()),
+                ('time', models.TimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['date', 'time', 'event'],
+                'indexes': [models.Index(fields=['date', 'time', 'event'], name='upcoming_feed_order_idx')],
+            },
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from events.search import backend_for_vendor
+
+
+def reinstall_sqlite_search_triggers(apps, schema_editor):
+    # adding attendee_count makes sqlite rebuild events_event, which takes
+    # the FTS triggers with it
+    if schema_editor.connection.vendor == 'sqlite':
+        backend_for_vendor('sqlite').install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_upcomingevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='attendee_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(reinstall_sqlite_search_triggers, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Rsvp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('going', 'Going'), ('waitlist', 'On the waitlist'), ('cancelled', 'Cancelled')], max_length=10)),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rsvps', to='events.event')),
+            ],
+            options={
+                'ordering': ['event', 'created_at'],
+                'indexes': [models.Index(fields=['event', 'status', 'created_at'], name='rsvp_event_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('event', 'email'), name='unique_active_rsvp_per_email')],
+            },
+        ),
+    ]
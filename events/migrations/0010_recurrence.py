@@ -0,0 +1,43 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_attendee_count_rsvp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='weekly', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Every how many days, weeks or months.', validators=[django.core.validators.MinValueValidator(1)])),
+                ('until', models.DateField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='How many dates in all, the first included.', null=True, validators=[django.core.validators.MinValueValidator(1)])),
+                ('last_date', models.DateField(editable=False, null=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence', to='events.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_date'], name='recurrence_last_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecurrenceException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_date', models.DateField()),
+                ('cancelled', models.BooleanField(default=False)),
+                ('date', models.DateField(blank=True, help_text='Moved to this day.', null=True)),
+                ('time', models.TimeField(blank=True, help_text='Or to this time.', null=True)),
+                ('recurrence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='events.recurrence')),
+            ],
+            options={
+                'ordering': ['recurrence', 'original_date'],
+                'constraints': [models.UniqueConstraint(fields=('recurrence', 'original_date'), name='unique_exception_per_date')],
+            },
+        ),
+    ]
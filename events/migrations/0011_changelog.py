@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_log(apps, schema_editor):
+    # every existing row once, so a mirror starting from 0 gets the lot;
+    # venues and categories first, before the events that point at them
+    ChangeLog = apps.get_model('events', 'ChangeLog')
+    for kind, model in [('venue', ('venues', 'Venue')), ('category', ('categories', 'Category')), ('event', ('events', 'Event'))]:
+        ids = apps.get_model(*model).objects.order_by('pk').values_list('pk', flat=True)
+        ChangeLog.objects.bulk_create((ChangeLog(kind=kind, object_id=pk) for pk in ids.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0005_category_name_lower_idx'),
+        ('events', '0010_recurrence'),
+        ('venues', '0006_venue_city_name_idx_venue_capacity_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('event', 'Event'), ('venue', 'Venue'), ('category', 'Category')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='changelog_object_idx')],
+            },
+        ),
+        migrations.RunPython(fill_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from events.search import backend_for_vendor
+
+
+def reinstall_sqlite_search_triggers(apps, schema_editor):
+    # the column changes make sqlite rebuild events_event, which takes the
+    # FTS triggers with it
+    if schema_editor.connection.vendor == 'sqlite':
+        backend_for_vendor('sqlite').install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # catches the schema up with models.py: time, description and venue
+    # were still NOT NULL in the table, so seed_data and anything else
+    # leaving them empty failed on a freshly migrated database
+
+    dependencies = [
+        ('events', '0011_changelog'),
+        ('venues', '0007_venue_capacity_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='max_attendees',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=8),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('published', 'Published'), ('cancelled', 'Cancelled')], default='draft', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='venue',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='venues.venue'),
+        ),
+        migrations.RunPython(reinstall_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+import uuid
+from calendar import monthrange
+
+from django.core.validators import MinValueValidator
+from django.db import connections, models, router, transaction
 from django.urls import reverse
-from datetime import date
+from django.utils import timezone
+from datetime import date, timedelta
 
 
 STATUS_CHOICES = [
@@ -9,6 +14,8 @@ STATUS_CHOICES = [
     ('cancelled', 'Cancelled'),
 ]
 
+VENUE_CONFLICT_MESSAGE = 'That venue already has an event on this date.'
+
 STATUS_COLORS = {
     'published': 'success',
     'cancelled': 'danger',
@@ -43,25 +50,77 @@ class Event(models.Model):
     price = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     max_attendees = models.PositiveIntegerField(null=True, blank=True)
+    # seats taken by RSVPs; only ever changed by the conditional UPDATEs in
+    # events/rsvp.py, never written back by save() (see below)
+    attendee_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     objects = EventManager()
 
+    # copies standing in for a later date of a recurring event are
+    # occurrences (events/recurrence.py); the row itself is the first date
+    is_occurrence = False
+    original_date = None
+
     class Meta:
         ordering = ['date', 'time']
+        indexes = [
+            # venue pages split a venue's events by date
+            models.Index(fields=['venue', 'date'], name='event_venue_date_idx'),
+            # MAX(updated_at) for the conditional GET validators
+            models.Index(fields=['updated_at'], name='event_updated_at_idx'),
+            # expire_events looks for status='published' AND date < today
+            models.Index(fields=['status', 'date'], name='event_status_date_idx'),
+        ]
+        constraints = [
+            # one live booking per venue per day, enforced by the database so
+            # two simultaneous submissions can't both get through. cancelled
+            # events don't hold the slot.
+            models.UniqueConstraint(
+                fields=['venue', 'date'],
+                condition=~models.Q(status='cancelled'),
+                name='unique_active_event_per_venue_date',
+                violation_error_message=VENUE_CONFLICT_MESSAGE,
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
     def get_absolute_url(self):
-        return reverse('event_detail', kwargs={'pk': self.pk})
+        url = reverse('event_detail', kwargs={'pk': self.pk})
+        if self.is_occurrence:
+            url += f'?on={self.date.isoformat()}'
+        return url
+
+    def save(self, *args, **kwargs):
+        # an edit form holds the attendee_count it loaded, and saving that
+        # back would undo every RSVP made in the meantime
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skip = {'attendee_count', *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                f.attname for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in skip
+            ]
+        super().save(*args, **kwargs)
+
+    def validate_constraints(self, exclude=None):
+        # the booking forms check the venue's day themselves, together with
+        # the series dates (BookingSaveMixin), so the form doesn't ask twice
+        if getattr(self, '_venue_day_checked', False):
+            exclude = {*(exclude or ()), 'venue'}
+        super().validate_constraints(exclude=exclude)
 
     def is_free(self):
         return self.price == 0
 
     def is_past(self):
-        return self.date < date.today()
+        if self.date >= date.today():
+            return False
+        # the first date of a series that still has dates to come isn't over
+        rule = None if self.is_occurrence else getattr(self, 'recurrence', None)
+        return rule is None or rule.has_ended()
 
     def get_price_display_str(self):
         if self.price == 0:
@@ -71,8 +130,325 @@ class Event(models.Model):
     def get_status_color(self):
         return STATUS_COLORS.get(self.status, 'secondary')
 
+    def is_full(self):
+        return self.max_attendees is not None and self.attendee_count >= self.max_attendees
+
+    def accepts_rsvps(self):
+        return self.status == 'published' and not self.is_past()
+
     def clean(self):
         from django.core.exceptions import ValidationError
         # don't let someone publish an event that's already passed
-        if self.date and self.date < date.today() and self.status == 'published':
+        if self.date and self.is_past() and self.status == 'published':
             raise ValidationError('Cannot publish events that are in the past.')
+
+
+class ExpirySweep(models.Model):
+    # one row per expire_events run that actually changed something
+    ran_at = models.DateTimeField(auto_now_add=True)
+    cutoff = models.DateField()
+    expired_count = models.PositiveIntegerField()
+    event_ids = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-ran_at']
+
+    def __str__(self):
+        return f'{self.ran_at:%Y-%m-%d %H:%M}: {self.expired_count} expired'
+
+
+class UpcomingEvent(models.Model):
+    """
+    The homepage feed: one row per published event from today on, kept in
+    (date, time) order by its index. Maintained by events/feed.py, so
+    reading it is a slice off the front of the index.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='feed_entry')
+    date = models.DateField()
+    time = models.TimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['date', 'time', 'event']
+        indexes = [
+            models.Index(fields=['date', 'time', 'event'], name='upcoming_feed_order_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.date}: {self.event_id}'
+
+
+class Rsvp(models.Model):
+    GOING = 'going'
+    WAITLIST = 'waitlist'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (GOING, 'Going'),
+        (WAITLIST, 'On the waitlist'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps')
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    # secret part of the cancel link, there are no user accounts
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['event', 'created_at']
+        indexes = [
+            # the waitlist in order, for promotions and positions
+            models.Index(fields=['event', 'status', 'created_at'], name='rsvp_event_status_idx'),
+        ]
+        constraints = [
+            # one live RSVP per person per event, so a double click can't take two seats
+            models.UniqueConstraint(
+                fields=['event', 'email'],
+                condition=~models.Q(status='cancelled'),
+                name='unique_active_rsvp_per_email',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} – {self.event_id} ({self.status})'
+
+
+class Recurrence(models.Model):
+    """
+    Repeats its event every `interval` days, weeks or months from the
+    event's own date, until `until` or for `count` dates in all (the first
+    included), or with neither for good. The dates are worked out when
+    asked for (events/recurrence.py); only exceptions are stored.
+    """
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    MONTHLY = 'monthly'
+    FREQUENCY_CHOICES = [
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+    ]
+
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='recurrence')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=WEEKLY)
+    interval = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1)], help_text='Every how many days, weeks or months.'
+    )
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)], help_text='How many dates in all, the first included.'
+    )
+    # the series' last date, None while it has no end; kept by save() so
+    # "is this series over" is a column lookup for the list queries
+    last_date = models.DateField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_date'], name='recurrence_last_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_id}: {self.describe()}'
+
+    def describe(self):
+        unit = {self.DAILY: 'day', self.WEEKLY: 'week', self.MONTHLY: 'month'}[self.frequency]
+        text = f'every {unit}' if self.interval == 1 else f'every {self.interval} {unit}s'
+        if self.until:
+            text += f' until {self.until:%d %b %Y}'
+        if self.count:
+            text += f', {self.count} times'
+        return text
+
+    def nth_date(self, first, n):
+        """The n-th date of the series starting on `first` (n=0)."""
+        if self.frequency == self.MONTHLY:
+            months = first.month - 1 + n * self.interval
+            year, month = first.year + months // 12, months % 12 + 1
+            # the 31st falls on the last day of shorter months
+            return date(year, month, min(first.day, monthrange(year, month)[1]))
+        step = 7 if self.frequency == self.WEEKLY else 1
+        return first + timedelta(days=n * step * self.interval)
+
+    def index_from(self, first, day):
+        """The index of the series' first date on or after `day`."""
+        if day <= first:
+            return 0
+        if self.frequency == self.MONTHLY:
+            n = ((day.year - first.year) * 12 + day.month - first.month) // self.interval
+        else:
+            step = 7 if self.frequency == self.WEEKLY else 1
+            n = (day - first).days // (step * self.interval)
+        while self.nth_date(first, n) < day:
+            n += 1
+        return n
+
+    def last_index(self, first):
+        # None while the series has no end
+        last = None if self.count is None else self.count - 1
+        if self.until is not None:
+            before = self.index_from(first, self.until + timedelta(days=1)) - 1
+            last = before if last is None else min(last, before)
+        return last
+
+    def dates(self, first, start, end, reverse=False):
+        """The series' dates from `start` to `end` (inclusive), lazily."""
+        low = self.index_from(first, start)
+        high = self.index_from(first, end + timedelta(days=1)) - 1
+        last = self.last_index(first)
+        if last is not None:
+            high = min(high, last)
+        indices = range(high, low - 1, -1) if reverse else range(low, high + 1)
+        return (self.nth_date(first, n) for n in indices)
+
+    def occurs_on(self, first, day):
+        n = self.index_from(first, day)
+        last = self.last_index(first)
+        return self.nth_date(first, n) == day and (last is None or n <= last)
+
+    def has_ended(self, today=None):
+        return self.last_date is not None and self.last_date < (today or date.today())
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        event = self.event
+        if self.until is not None and event.date is not None and self.until < event.date:
+            raise ValidationError({'until': 'The series has to end after its first date.'})
+        if event.venue_id is not None and event.date is not None and event.status != 'cancelled':
+            # the first date is the event row, which the booking constraint covers
+            from venues.availability import series_clashes
+            exceptions = list(self.exceptions.all()) if self.pk else []
+            clashes = series_clashes(event.venue_id, event.date, self, exceptions, exclude_event_id=event.pk)
+            if clashes:
+                raise ValidationError(clash_message(event.venue, clashes))
+
+    def end_date(self, first):
+        last = self.last_index(first)
+        return None if last is None else self.nth_date(first, max(last, 0))
+
+    def save(self, *args, **kwargs):
+        self.last_date = self.end_date(self.event.date)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'last_date'}
+        super().save(*args, **kwargs)
+
+
+class RecurrenceException(models.Model):
+    """One date of a series that was cancelled, or moved to another day or time."""
+    recurrence = models.ForeignKey(Recurrence, on_delete=models.CASCADE, related_name='exceptions')
+    original_date = models.DateField()
+    cancelled = models.BooleanField(default=False)
+    date = models.DateField(null=True, blank=True, help_text='Moved to this day.')
+    time = models.TimeField(null=True, blank=True, help_text='Or to this time.')
+
+    class Meta:
+        ordering = ['recurrence', 'original_date']
+        constraints = [
+            models.UniqueConstraint(fields=['recurrence', 'original_date'], name='unique_exception_per_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.recurrence.event_id} on {self.original_date}'
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.original_date is None:
+            return
+        event = self.recurrence.event
+        if self.original_date == event.date:
+            raise ValidationError({'original_date': 'That is the event itself, edit the event instead.'})
+        if not self.recurrence.occurs_on(event.date, self.original_date):
+            raise ValidationError({'original_date': 'The series has no date on that day.'})
+        if self.cancelled or self.date is None or self.date == self.original_date:
+            return
+        # two dates of one series on the same day would be the same occurrence
+        taken_by_series = self.recurrence.occurs_on(event.date, self.date) or (
+            RecurrenceException.objects
+            .filter(recurrence=self.recurrence, date=self.date, cancelled=False)
+            .exclude(pk=self.pk).exists()
+        )
+        if taken_by_series:
+            raise ValidationError({'date': 'The series already has a date on that day.'})
+        if event.venue_id is not None and event.status != 'cancelled':
+            from venues.availability import clashing_dates
+            if clashing_dates(event.venue_id, [self.date], exclude_event_id=event.pk):
+                raise ValidationError({'date': VENUE_CONFLICT_MESSAGE})
+
+
+def current_txid(connection):
+    # the writing transaction's id on PostgreSQL, for events/sync.py to
+    # tell which entries are committed; other backends don't need it
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_current_xact_id()::text::bigint')
+        return cursor.fetchone()[0]
+
+
+class ChangeLogManager(models.Manager):
+
+    def record(self, kind, object_ids, deleted=False):
+        """
+        Logs that the `kind` objects with `object_ids` were saved (or
+        deleted). Each object's earlier entry is replaced by one at the end
+        of the log, so the log holds every object once.
+        """
+        ids = sorted({pk for pk in object_ids if pk is not None})
+        if not ids:
+            return
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            txid = current_txid(connections[using])
+            # in chunks so the IN lists stay short for bulk callers
+            for start in range(0, len(ids), 1000):
+                chunk = ids[start:start + 1000]
+                self.filter(kind=kind, object_id__in=chunk).delete()
+                self.bulk_create([
+                    self.model(kind=kind, object_id=pk, deleted=deleted, txid=txid) for pk in chunk
+                ])
+
+
+class ChangeLog(models.Model):
+    """
+    The delta sync feed (events/sync.py): the latest change to every event,
+    venue and category, deletes included, in the order they happened. The
+    id is the sync cursor, so reading the changes after one is a range scan
+    of the primary key. Written by the signal receivers, and by the bulk
+    paths that skip them.
+    """
+    EVENT = 'event'
+    VENUE = 'venue'
+    CATEGORY = 'category'
+    KIND_CHOICES = [
+        (EVENT, 'Event'),
+        (VENUE, 'Venue'),
+        (CATEGORY, 'Category'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+    # PostgreSQL only, see current_txid()
+    txid = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # finding an object's earlier entry in record()
+            models.Index(fields=['kind', 'object_id'], name='changelog_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.pk}: {self.kind} {self.object_id}{" deleted" if self.deleted else ""}'
+
+
+def clash_message(venue, days, shown=3):
+    text = ', '.join(day.strftime('%a %d %b %Y') for day in days[:shown])
+    if len(days) > shown:
+        text += f' and {len(days) - shown} more'
+    return f'{venue.name} is already booked on {text}.'
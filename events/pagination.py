@@ -0,0 +1,201 @@
+import base64
+import binascii
+import heapq
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+EVENTS_PER_PAGE = 12
+
+# sort option from the list page -> (model field, descending?)
+# pk is always appended as the tie breaker so the order is stable
+EVENT_SORT_KEYS = {
+    'date': ('date', False),
+    'title': ('title', False),
+    'price_low': ('price', False),
+    'price_high': ('price', True),
+    # only offered when there's a search query, see events.search
+    'relevance': ('search_rank', True),
+}
+
+
+class KeysetPage:
+    """One page of results plus the cursors to move either way from it."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(value, pk, backwards=False):
+    payload = json.dumps([value, pk, 1 if backwards else 0], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """Returns (value, pk, backwards) or None if the cursor is junk."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk, backwards = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if value is not None:
+            value = field.to_python(value)
+        return value, int(pk), bool(backwards)
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        return None
+
+
+def _after(name, value, pk, descending):
+    # rows strictly "after" (value, pk) in the given direction
+    op = 'lt' if descending else 'gt'
+    return Q(**{f'{name}__{op}': value}) | Q(**{name: value, f'pk__{op}': pk})
+
+
+def keyset_ordering(sort_key):
+    name, descending = sort_key
+    return [f'-{name}', '-pk'] if descending else [name, 'pk']
+
+
+def _keyset_query(queryset, sort_key, cursor, per_page):
+    name, descending = sort_key
+    if name in queryset.query.annotations:
+        field = queryset.query.annotations[name].output_field
+    else:
+        field = queryset.model._meta.get_field(name)
+    position = decode_cursor(cursor, field)
+    backwards = position[2] if position else False
+
+    # walking backwards = walking forwards over the reversed ordering
+    reverse = descending != backwards
+    qs = queryset.order_by(*keyset_ordering((name, reverse)))
+    if position:
+        qs = qs.filter(_after(name, position[0], position[1], reverse))
+    return qs[:per_page + 1], position
+
+
+def _keyset_page(rows, name, position, per_page):
+    backwards = position[2] if position else False
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage(rows)
+
+    def cursor_for(obj, back):
+        if isinstance(obj, dict):
+            # values() rows, as used by the JSON API
+            return encode_cursor(obj[name], obj['id'], back)
+        return encode_cursor(getattr(obj, name), obj.pk, back)
+
+    if backwards:
+        next_cursor = cursor_for(rows[-1], False)
+        previous_cursor = cursor_for(rows[0], True) if has_more else None
+    else:
+        next_cursor = cursor_for(rows[-1], False) if has_more else None
+        previous_cursor = cursor_for(rows[0], True) if position else None
+
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def _merge_rows(rows, sort_key, position, per_page, merge):
+    name, descending = sort_key
+    backwards = position[2] if position else False
+    reverse = descending != backwards
+    extra = merge(position[:2] if position else None, reverse)
+    merged = heapq.merge(rows, extra, key=lambda obj: (getattr(obj, name), obj.pk), reverse=reverse)
+    return list(islice(merged, per_page + 1))
+
+
+def paginate_keyset(queryset, sort_key, cursor=None, per_page=EVENTS_PER_PAGE, merge=None):
+    """
+    Seek-based pagination over (sort field, pk). Unlike OFFSET, every page
+    is a range scan starting from the last row seen, so page 500 costs the
+    same as page 1. The sort field (a model field or an annotation) must
+    not be nullable.
+
+    merge(after, reverse) can return more objects to interleave with the
+    rows (the occurrences of recurring events): an iterable in the same
+    (sort field, pk) order, reversed when `reverse`, starting after the
+    cursor's (value, pk) `after` (None on the first page). Only as much of
+    it as the page needs is read.
+    """
+    qs, position = _keyset_query(queryset, sort_key, cursor, per_page)
+    rows = list(qs)
+    if merge is not None:
+        rows = _merge_rows(rows, sort_key, position, per_page, merge)
+    return _keyset_page(rows, sort_key[0], position, per_page)
+
+
+async def apaginate_keyset(queryset, sort_key, cursor=None, per_page=EVENTS_PER_PAGE):
+    """paginate_keyset for async views, same query and cursors."""
+    qs, position = _keyset_query(queryset, sort_key, cursor, per_page)
+    # chunk_size so prefetch_related works with aiterator(); one page is one chunk
+    rows = [row async for row in qs.aiterator(chunk_size=per_page + 1)]
+    return _keyset_page(rows, sort_key[0], position, per_page)
+
+
+def planner_row_estimate(queryset):
+    """
+    PostgreSQL's estimate of how many rows the table behind an unfiltered
+    `queryset` has (pg_class.reltuples, refreshed by autovacuum/ANALYZE),
+    or None when there is no such estimate to use.
+    """
+    conn = connections[queryset.db]
+    if conn.vendor != 'postgresql' or queryset.query.has_filters():
+        return None
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 means the table has never been analyzed
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CountingPaginator(Paginator):
+    """
+    A Paginator whose count is a COUNT query, or with LIST_COUNT_MODE =
+    'estimate' and a big enough unfiltered table on PostgreSQL, the
+    planner's row estimate, which costs nothing to read. `estimated` says
+    which one `count` is.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        if getattr(settings, 'LIST_COUNT_MODE', 'exact') == 'estimate':
+            rows = planner_row_estimate(self.object_list)
+            if rows is not None and rows >= getattr(settings, 'LIST_COUNT_ESTIMATE_MIN_ROWS', 100_000):
+                self.estimated = True
+                return rows
+        return super().count
@@ -0,0 +1,173 @@
+import copy
+import heapq
+from datetime import date, timedelta
+from itertools import islice
+from operator import attrgetter
+
+from django.db.models import Q
+
+from .models import Event
+
+
+# how far ahead a series with no end (or no end asked for) is expanded
+RECURRENCE_HORIZON_DAYS = 365
+
+# occurrences sort like rows in the keyset paginator: date, then pk
+OCCURRENCE_ORDER = attrgetter('date', 'pk')
+
+_DAY = timedelta(days=1)
+
+
+def horizon(today=None):
+    return (today or date.today()) + timedelta(days=RECURRENCE_HORIZON_DAYS)
+
+
+def running(today=None):
+    # series with dates on or after `today`, whatever their first date
+    return Q(recurrence__last_date__isnull=True) | Q(recurrence__last_date__gte=today or date.today())
+
+
+def with_rules(events):
+    """The recurring events among `events`, with their rule and exceptions loaded."""
+    return (
+        events.filter(recurrence__isnull=False)
+        .order_by()
+        .select_related('recurrence')
+        .prefetch_related('recurrence__exceptions')
+    )
+
+
+def as_occurrence(event, day, time=None, original_date=None):
+    occurrence = copy.copy(event)
+    occurrence.date = day
+    if time is not None:
+        occurrence.time = time
+    occurrence.is_occurrence = True
+    occurrence.original_date = original_date or day
+    return occurrence
+
+
+def occurrence_dates(rule, first, exceptions=(), start=None, end=None, reverse=False):
+    """
+    (date, time, original date) for every date of the series starting on
+    `first` after the first one, from `start` to `end` (inclusive; with no
+    end, up to the horizon), in date order and lazily. `exceptions` are
+    the rule's RecurrenceException rows: cancelled dates are left out,
+    moved ones come at their new day and time. time is None unless moved.
+    """
+    low = first + _DAY if start is None else max(start, first + _DAY)
+    high = horizon() if end is None else end
+    changed = {ex.original_date: ex for ex in exceptions}
+
+    regular = (
+        (day, None, day)
+        for day in rule.dates(first, low, high, reverse)
+        if day not in changed
+    )
+    moved = sorted(
+        (
+            (ex.date or ex.original_date, ex.time, ex.original_date)
+            for ex in changed.values()
+            if not ex.cancelled
+            and low <= (ex.date or ex.original_date) <= high
+            # left over from before the event or its rule was changed
+            and ex.original_date != first and rule.occurs_on(first, ex.original_date)
+        ),
+        key=lambda entry: entry[0],
+        reverse=reverse,
+    )
+    return heapq.merge(regular, moved, key=lambda entry: entry[0], reverse=reverse)
+
+
+def occurrences(event, start=None, end=None, reverse=False):
+    """
+    The later dates of `event`'s series (see occurrence_dates) as copies
+    of the event with the date, and for moved dates the time, swapped in.
+    `event` needs its recurrence and exceptions loaded (with_rules).
+    """
+    rule = event.recurrence
+    for day, time, original in occurrence_dates(rule, event.date, rule.exceptions.all(), start, end, reverse):
+        yield as_occurrence(event, day, time, original)
+
+
+def occurrence_on(event, day):
+    """`event` as it happens on `day`, one of its series' later dates, or None."""
+    if getattr(event, 'recurrence', None) is None:
+        return None
+    return next(occurrences(event, day, day), None)
+
+
+def merge_occurrences(series, after=None, reverse=False, start=None, end=None):
+    """
+    The occurrences of every event in `series` (with_rules) as one stream in
+    OCCURRENCE_ORDER, or its reverse, starting after the (date, pk)
+    position `after` when given. heapq.merge only ever holds the next
+    occurrence of each series, so no series is expanded further than what
+    is read off the front.
+    """
+    streams = []
+    for event in series:
+        low, high = start, end
+        if after is not None:
+            day, pk = after
+            # the cursor's own day still counts for series sorting past its pk
+            if reverse:
+                bound = day if event.pk < pk else day - _DAY
+                high = bound if high is None else min(high, bound)
+            else:
+                bound = day if event.pk > pk else day + _DAY
+                low = bound if low is None else max(low, bound)
+        streams.append(occurrences(event, low, high, reverse))
+    return heapq.merge(*streams, key=OCCURRENCE_ORDER, reverse=reverse)
+
+
+def merge_upcoming(events, series, limit, today=None):
+    """
+    The first `limit` of `events` (upcoming rows in date order) merged
+    with the occurrences of `series` from today on.
+    """
+    today = today or date.today()
+    upcoming = merge_occurrences(series, start=today)
+    return list(islice(heapq.merge(events, upcoming, key=attrgetter('date')), limit))
+
+
+def upcoming_series(today=None):
+    # what the homepage merges into the feed
+    return with_rules(
+        Event.objects.filter(running(today), status='published', date__lte=horizon(today)).select_related('venue')
+    )
+
+
+def merge_for(events, sort_key):
+    """
+    paginate_keyset's merge= for a page of `events`: the occurrences of
+    the recurring ones when the list is sorted by date. Other orders list
+    each series once.
+    """
+    if sort_key[0] != 'date':
+        return None
+    return lambda after, reverse: merge_occurrences(with_rules(events), after, reverse)
+
+
+def series_context(event, on=None, next_count=5):
+    """
+    What the detail page shows about `event`'s series: the occurrence on
+    the `on` date (YYYY-MM-DD) in place of the event, the rule and the
+    next few dates.
+    """
+    rule = getattr(event, 'recurrence', None)
+    if rule is None:
+        return {'event': event}
+    shown = event
+    if on:
+        try:
+            shown = occurrence_on(event, date.fromisoformat(on)) or event
+        except ValueError:
+            pass
+    today = date.today()
+    first = [event] if event.date >= today else []
+    return {
+        'event': shown,
+        'recurrence': rule,
+        'next_dates': list(islice(heapq.merge(first, occurrences(event, start=today), key=OCCURRENCE_ORDER), next_count)),
+    }
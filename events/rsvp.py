@@ -0,0 +1,107 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Event, Rsvp
+
+
+class RsvpClosed(Exception):
+    pass
+
+
+def _take_seat(event_id):
+    # one conditional UPDATE: the database checks "is there room" and takes
+    # the seat in the same statement, so two requests for the last seat
+    # can't both get it. no row updated means the event is full.
+    return Event.objects.filter(
+        Q(max_attendees__isnull=True) | Q(attendee_count__lt=F('max_attendees')),
+        pk=event_id,
+    ).update(attendee_count=F('attendee_count') + 1) == 1
+
+
+def _give_back_seat(event_id, seats=1):
+    Event.objects.filter(pk=event_id, attendee_count__gte=seats).update(
+        attendee_count=F('attendee_count') - seats
+    )
+
+
+def _lock_event(event_id):
+    # serializes the waitlist paths per event; taking a free seat doesn't
+    # need it, that's the conditional UPDATE above
+    return Event.objects.select_for_update().filter(pk=event_id).values('max_attendees', 'attendee_count').get()
+
+
+def _promote(event_id):
+    # call inside a transaction; locks the event (again, for cancel_rsvp)
+    seats = _lock_event(event_id)
+    waiting = Rsvp.objects.filter(event_id=event_id, status=Rsvp.WAITLIST).order_by('created_at', 'pk')
+    if seats['max_attendees'] is not None:
+        free = seats['max_attendees'] - seats['attendee_count']
+        if free <= 0:
+            return []
+        waiting = waiting[:free]
+    ids = list(waiting.values_list('pk', flat=True))
+    if ids:
+        Rsvp.objects.filter(pk__in=ids).update(status=Rsvp.GOING, promoted_at=timezone.now())
+        Event.objects.filter(pk=event_id).update(attendee_count=F('attendee_count') + len(ids))
+    return ids
+
+
+def rsvp(event, name, email):
+    """
+    Takes a seat at `event` for `email`, or puts them on the waitlist when
+    it's full. Returns (rsvp, created); asking again while the first RSVP
+    is still live just returns that one.
+    """
+    if not event.accepts_rsvps():
+        raise RsvpClosed('This event is not taking RSVPs.')
+    email = email.strip().lower()
+    try:
+        with transaction.atomic():
+            entry = Rsvp.objects.create(event=event, name=name, email=email, status=Rsvp.GOING)
+            if not _take_seat(event.pk):
+                # full, unless a cancellation is freeing a seat right now: it
+                # holds the lock while it promotes, so wait for it and try
+                # again, then join the waitlist before letting go of the lock
+                # so the next promotion sees us
+                _lock_event(event.pk)
+                if not _take_seat(event.pk):
+                    entry.status = Rsvp.WAITLIST
+                    entry.save(update_fields=['status'])
+    except IntegrityError:
+        # unique_active_rsvp_per_email: a double submit, or they already RSVP'd
+        return Rsvp.objects.exclude(status=Rsvp.CANCELLED).get(event=event, email=email), False
+    return entry, True
+
+
+def cancel_rsvp(entry):
+    """
+    Cancels `entry`. A cancelled seat goes to the longest-waiting people on
+    the waitlist. Returns False when it was already cancelled.
+    """
+    with transaction.atomic():
+        _lock_event(entry.event_id)
+        entry.refresh_from_db(fields=['status'])
+        if entry.status == Rsvp.CANCELLED:
+            return False
+        was_going = entry.status == Rsvp.GOING
+        entry.status = Rsvp.CANCELLED
+        entry.cancelled_at = timezone.now()
+        entry.save(update_fields=['status', 'cancelled_at'])
+        if was_going:
+            _give_back_seat(entry.event_id)
+            _promote(entry.event_id)
+    return True
+
+
+def promote_waitlist(event_id):
+    # after max_attendees was raised or cleared
+    with transaction.atomic():
+        return _promote(event_id)
+
+
+def waitlist_position(entry):
+    if entry.status != Rsvp.WAITLIST:
+        return None
+    ahead = Q(created_at__lt=entry.created_at) | Q(created_at=entry.created_at, pk__lt=entry.pk)
+    return Rsvp.objects.filter(ahead, event_id=entry.event_id, status=Rsvp.WAITLIST).count() + 1
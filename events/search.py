@@ -0,0 +1,206 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Event
+
+
+EVENT_TABLE = Event._meta.db_table
+FTS_TABLE = f'{EVENT_TABLE}_fts'
+
+
+def _terms(query):
+    # only keep word characters so nothing user typed can reach the
+    # tsquery / MATCH parser as syntax
+    return re.findall(r'\w+', query.lower())
+
+
+class BaseSearchBackend:
+    """
+    A backend narrows an Event queryset down to the matches for `query` and
+    annotates each row with `search_rank` (higher is better). It has to
+    return a queryset so the venue/category filters and the keyset paginator
+    keep working on top of it.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def no_results(self, queryset):
+        # still annotated so sorting by relevance works on an empty result
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    def install(self, conn):
+        """Create whatever index structures the backend needs (idempotent)."""
+
+    def uninstall(self, conn):
+        pass
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    # the original icontains filter, works on any database but can't use an index
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Full-text search over a trigger-maintained tsvector column with a GIN
+    index. Every term is matched as a prefix so half-typed words still hit,
+    and titles are also matched by trigram similarity (gin_trgm_ops index)
+    so small typos don't return an empty page.
+    """
+
+    config = 'english'
+
+    def _tsquery(self, terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def search(self, queryset, query):
+        terms = _terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        tsquery = self._tsquery(terms)
+        matches = RawSQL(
+            f'({EVENT_TABLE}.search_vector @@ to_tsquery(%s, %s) OR {EVENT_TABLE}.title %% %s)',
+            [self.config, tsquery, query],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f'(ts_rank_cd({EVENT_TABLE}.search_vector, to_tsquery(%s, %s)) + similarity({EVENT_TABLE}.title, %s))',
+            [self.config, tsquery, query],
+            output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+    def install(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(f'ALTER TABLE {EVENT_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector')
+            cursor.execute(f"""
+                CREATE OR REPLACE FUNCTION {EVENT_TABLE}_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('{self.config}', coalesce(NEW.title, '')), 'A') ||
+                        setweight(to_tsvector('{self.config}', coalesce(NEW.description, '')), 'B');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+            """)
+            cursor.execute(f'DROP TRIGGER IF EXISTS {EVENT_TABLE}_search_vector_trigger ON {EVENT_TABLE}')
+            cursor.execute(f"""
+                CREATE TRIGGER {EVENT_TABLE}_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF title, description ON {EVENT_TABLE}
+                FOR EACH ROW EXECUTE FUNCTION {EVENT_TABLE}_search_vector_update()
+            """)
+            # touching title fires the trigger for the rows that already exist
+            cursor.execute(f'UPDATE {EVENT_TABLE} SET title = title')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {EVENT_TABLE}_search_vector_gin '
+                f'ON {EVENT_TABLE} USING gin (search_vector)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {EVENT_TABLE}_title_trgm '
+                f'ON {EVENT_TABLE} USING gin (title gin_trgm_ops)'
+            )
+
+    def uninstall(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {EVENT_TABLE}_title_trgm')
+            cursor.execute(f'DROP INDEX IF EXISTS {EVENT_TABLE}_search_vector_gin')
+            cursor.execute(f'DROP TRIGGER IF EXISTS {EVENT_TABLE}_search_vector_trigger ON {EVENT_TABLE}')
+            cursor.execute(f'DROP FUNCTION IF EXISTS {EVENT_TABLE}_search_vector_update()')
+            cursor.execute(f'ALTER TABLE {EVENT_TABLE} DROP COLUMN IF EXISTS search_vector')
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    SQLite version of the above, mostly so search behaves the same way on a
+    laptop. Uses an external-content FTS5 table kept in sync by triggers and
+    ranks with bm25 (which is "lower is better", hence the minus).
+    """
+
+    def _match(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        terms = _terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        match = self._match(terms)
+        hits = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25 only works inside a MATCH query. A plain correlated
+        # "MATCH ... AND rowid = x" re-runs the whole match for every row
+        # (seconds for a common word), so the matches are ranked once in a
+        # materialized CTE (SQLite 3.35+) and looked up per row from there.
+        rank = RawSQL(
+            f'WITH hits AS MATERIALIZED ('
+            f'SELECT rowid AS id, -bm25({FTS_TABLE}, 10.0, 1.0) AS score '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+            f') SELECT score FROM hits WHERE hits.id = {EVENT_TABLE}.id',
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=hits).annotate(search_rank=rank)
+
+    def install(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, description, content='{EVENT_TABLE}', content_rowid='id', "
+                f"tokenize='porter unicode61')"
+            )
+            # the table gets rebuilt by sqlite migrations now and then, which
+            # drops its triggers - so always recreate them here
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f"""
+                CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {EVENT_TABLE} BEGIN
+                    INSERT INTO {FTS_TABLE}(rowid, title, description)
+                    VALUES (new.id, new.title, new.description);
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {EVENT_TABLE} BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+                    VALUES ('delete', old.id, old.title, old.description);
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF title, description ON {EVENT_TABLE} BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+                    VALUES ('delete', old.id, old.title, old.description);
+                    INSERT INTO {FTS_TABLE}(rowid, title, description)
+                    VALUES (new.id, new.title, new.description);
+                END
+            """)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    def uninstall(self, conn):
+        with conn.cursor() as cursor:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteFTS5Backend,
+}
+
+
+def backend_for_vendor(vendor):
+    return VENDOR_BACKENDS.get(vendor, SimpleSearchBackend)()
+
+
+def get_search_backend():
+    path = getattr(settings, 'EVENT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return backend_for_vendor(connection.vendor)
@@ -1,13 +1,140 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from datetime import date
+from django.utils import timezone
 
-from .models import Event
+from . import feed
+from .cache import bump_generation
+from .calendars import invalidate_calendars
+from .models import ChangeLog, Event, Recurrence, RecurrenceException
+from .rsvp import promote_waitlist
 
 
 # using a signal here so this runs even on admin saves,
-# not just through the form
+# not just through the form. the bulk of the work is done by
+# `manage.py expire_events`; this only catches rows saved in between
 @receiver(pre_save, sender=Event)
 def auto_cancel_past_published_events(sender, instance, **kwargs):
-    if instance.date < date.today() and instance.status == 'published':
+    # is_past() knows a series with dates to come isn't over
+    if instance.status == 'published' and instance.is_past():
         instance.status = 'cancelled'
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_pages(sender, **kwargs):
+    bump_generation('events')
+
+
+@receiver(post_save, sender=Event)
+def log_event_change(sender, instance, **kwargs):
+    # fixtures too, mirrors want those
+    ChangeLog.objects.record(ChangeLog.EVENT, [instance.pk])
+
+
+@receiver(post_delete, sender=Event)
+def log_event_delete(sender, instance, **kwargs):
+    ChangeLog.objects.record(ChangeLog.EVENT, [instance.pk], deleted=True)
+
+
+@receiver(pre_save, sender=Event)
+def remember_calendar_venue(sender, instance, raw=False, **kwargs):
+    # moving an event to another venue changes the old venue's feed too
+    if not raw and instance.pk is not None:
+        instance._calendar_venue_id = (
+            Event.objects.filter(pk=instance.pk).values_list('venue_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Event)
+def invalidate_event_calendars(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_calendars([instance.pk], venue_ids=[getattr(instance, '_calendar_venue_id', None)])
+
+
+@receiver(pre_delete, sender=Event)
+def remember_calendar_categories(sender, instance, **kwargs):
+    # the m2m rows are gone by the time post_delete fires
+    instance._calendar_category_ids = list(instance.categories.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Event)
+def invalidate_calendars_after_delete(sender, instance, **kwargs):
+    invalidate_calendars(
+        venue_ids=[instance.venue_id],
+        category_ids=getattr(instance, '_calendar_category_ids', []),
+    )
+
+
+@receiver(post_save, sender=Event)
+def update_upcoming_feed(sender, instance, raw=False, **kwargs):
+    # deletes are covered by the feed row's on_delete=CASCADE
+    if not raw:
+        feed.sync_event(instance)
+
+
+@receiver(post_save, sender=Event)
+def fill_raised_capacity(sender, instance, created, raw=False, **kwargs):
+    # max_attendees may have gone up (or away); hand the new seats to the waitlist
+    if not created and not raw:
+        promote_waitlist(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def move_series_end(sender, instance, created, raw=False, **kwargs):
+    # the series counts from the event's date, so its last date moves with it
+    if created or raw:
+        return
+    for rule in Recurrence.objects.filter(event=instance):
+        if rule.end_date(instance.date) != rule.last_date:
+            rule.event = instance
+            rule.save(update_fields=['last_date'])
+
+
+@receiver(post_save, sender=Recurrence)
+@receiver(post_delete, sender=Recurrence)
+@receiver(post_save, sender=RecurrenceException)
+@receiver(post_delete, sender=RecurrenceException)
+def invalidate_series_pages(sender, instance, raw=False, **kwargs):
+    # the series' dates changed without the event row changing; bump its
+    # updated_at like a categories change does
+    if raw:
+        return
+    if sender is Recurrence:
+        events = Event.objects.filter(pk=instance.event_id)
+    else:
+        # by id: when the whole series is being deleted the rule may be gone already
+        events = Event.objects.filter(recurrence__pk=instance.recurrence_id)
+    event_ids = list(events.values_list('pk', flat=True))
+    Event.objects.filter(pk__in=event_ids).update(updated_at=timezone.now())
+    bump_generation('events')
+    invalidate_calendars(event_ids)
+    ChangeLog.objects.record(ChangeLog.EVENT, event_ids)
+
+
+@receiver(m2m_changed, sender=Event.categories.through)
+def invalidate_event_pages_on_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_event_ids = list(instance.events.values_list('pk', flat=True))
+        else:
+            instance._cleared_category_ids = list(instance.categories.values_list('pk', flat=True))
+    if not action.startswith('post_'):
+        return
+    # the event row itself doesn't change, but its page does; bump
+    # updated_at so the ETag/Last-Modified validators notice
+    if not reverse:
+        event_ids = [instance.pk]
+        # removed or cleared categories aren't linked any more, name them
+        category_ids = getattr(instance, '_cleared_category_ids', []) if action == 'post_clear' else pk_set or []
+    elif action == 'post_clear':
+        event_ids = getattr(instance, '_cleared_event_ids', [])
+        category_ids = [instance.pk]
+    else:
+        event_ids = pk_set
+        category_ids = [instance.pk]
+    if event_ids:
+        Event.objects.filter(pk__in=event_ids).update(updated_at=timezone.now())
+        ChangeLog.objects.record(ChangeLog.EVENT, event_ids)
+    bump_generation('events')
+    # every feed with these events lists their categories
+    invalidate_calendars(event_ids or (), category_ids=category_ids)
@@ -0,0 +1,136 @@
+from collections import defaultdict
+
+from django.db import connections, router
+
+from categories.api import CATEGORY_FIELDS
+from categories.models import Category
+from venues.api import VENUE_FIELDS
+from venues.models import Venue
+from .api import EVENT_FIELDS, ApiError, api_view, columns_for, json_response, parse_limit, pick
+from .models import ChangeLog, Event
+
+
+SYNC_BATCH_SIZE = 500
+SYNC_MAX_BATCH_SIZE = 2000
+
+# what a mirror gets for each kind: the API fields, minus the ones that
+# change without the row being saved (the venue's name on an event, a
+# category's event counter), which mirrors can work out themselves
+SYNC_FIELDS = {
+    ChangeLog.EVENT: (Event, 'events', {
+        name: lookup for name, lookup in EVENT_FIELDS.items() if name not in ('venue_name', 'venue_city')
+    }),
+    ChangeLog.VENUE: (Venue, 'venues', VENUE_FIELDS),
+    ChangeLog.CATEGORY: (Category, 'categories', {
+        name: lookup for name, lookup in CATEGORY_FIELDS.items() if name != 'event_count'
+    }),
+}
+
+
+def parse_since(request):
+    raw = request.GET.get('since', '') or '0'
+    if not raw.isdigit():
+        raise ApiError('since must be a cursor from an earlier response, or 0 to start over')
+    return int(raw)
+
+
+def fill_category_ids(rows, fields):
+    # just the ids: the categories themselves come through the feed too
+    by_event = defaultdict(list)
+    links = (
+        Event.categories.through.objects
+        .filter(event_id__in=[row['id'] for row in rows])
+        .order_by('category_id')
+        .values_list('event_id', 'category_id')
+    )
+    for event_id, category_id in links:
+        by_event[event_id].append(category_id)
+    for row in rows:
+        row['categories'] = by_event.get(row['id'], [])
+
+
+def oldest_running_txid(connection):
+    """
+    On PostgreSQL, the id of the oldest transaction still running: every
+    transaction below it has committed or rolled back. None elsewhere.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+        return cursor.fetchone()[0]
+
+
+def read_changes(since, limit):
+    """
+    Up to `limit` log entries after the cursor `since`, oldest first, and
+    whether more can be read straight away.
+
+    Ids are taken when an entry is inserted but only show up when its
+    transaction commits, so on PostgreSQL a committed id can have a lower
+    one still in flight behind it (a long import, seed_data's single
+    transaction), and a mirror whose cursor moved past that one would never
+    see it. So the feed stops at the first entry written by a transaction
+    that was still running when the read started. SQLite has one writer at
+    a time, which commits its ids before the next one can take any.
+    """
+    using = router.db_for_read(ChangeLog)
+    # before the read: whatever committed below it is in the read's snapshot
+    horizon = oldest_running_txid(connections[using])
+    entries = list(
+        ChangeLog.objects.using(using).filter(pk__gt=since).order_by('pk')
+        .values_list('pk', 'kind', 'object_id', 'deleted', 'txid')[:limit + 1]
+    )
+    more = len(entries) > limit
+    entries = entries[:limit]
+    if horizon is not None:
+        for i, (_, _, _, _, txid) in enumerate(entries):
+            # entries from before the column was filled in are long committed
+            if txid is not None and txid >= horizon:
+                return entries[:i], False
+    return entries, more
+
+
+def since_url(request, cursor):
+    params = request.GET.copy()
+    params['since'] = cursor
+    return request.build_absolute_uri('?' + params.urlencode())
+
+
+@api_view
+def sync_events(request):
+    """
+    The changes feed for mirrors: GET /sync/events?since=<cursor> returns
+    the events, venues and categories saved after the cursor, as they are
+    now, and the ids of the deleted ones, at most limit= entries at a time.
+    Pass back `cursor` as since= until `more` is false, then poll. since=0
+    (or none) starts from the beginning, which is the whole catalogue.
+
+    Each object turns up once per batch, in its latest state; an event can
+    arrive before the venue or category it points at, in a later batch.
+    """
+    since = parse_since(request)
+    entries, more = read_changes(since, parse_limit(request, SYNC_BATCH_SIZE, SYNC_MAX_BATCH_SIZE))
+
+    changed, deleted = defaultdict(list), defaultdict(list)
+    for _, kind, object_id, is_deleted, _ in entries:
+        (deleted if is_deleted else changed)[kind].append(object_id)
+
+    payload = {}
+    for kind, (model, name, lookups) in SYNC_FIELDS.items():
+        rows = []
+        if changed[kind]:
+            # rows deleted since are just missing, their tombstones come later
+            rows = list(model.objects.filter(pk__in=changed[kind]).order_by('pk').values(*columns_for(lookups, lookups)))
+            if kind == ChangeLog.EVENT:
+                fill_category_ids(rows, lookups)
+        payload[name] = [pick(row, lookups, lookups) for row in rows]
+
+    cursor = entries[-1][0] if entries else since
+    return json_response({
+        'cursor': str(cursor),
+        'more': more,
+        'next': since_url(request, cursor) if more else None,
+        **payload,
+        'deleted': {name: sorted(deleted[kind]) for kind, (_, name, _) in SYNC_FIELDS.items()},
+    })
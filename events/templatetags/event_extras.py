@@ -1,6 +1,8 @@
 from django import template
 from datetime import date
 
+from venues.models import size_label
+
 register = template.Library()
 
 
@@ -41,13 +43,6 @@ def short_desc(text, length=120):
 @register.filter
 def venue_size(capacity):
     try:
-        cap = int(capacity)
-        if cap < 50:
-            return 'Intimate'
-        elif cap < 200:
-            return 'Small'
-        elif cap < 1000:
-            return 'Medium'
-        return 'Large'
+        return size_label(int(capacity))
     except (ValueError, TypeError):
         return 'Unknown'
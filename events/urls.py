@@ -1,13 +1,22 @@
 # events/urls.py
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+# the read-only pages come from async_views.py when running async
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('events/', views.event_list, name='event_list'),
+    path('', read_views.home, name='home'),
+    path('events/', read_views.event_list, name='event_list'),
+    path('events/export.csv', views.event_export_csv, name='event_export_csv'),
+    path('events/export.ics', views.event_export_ics, name='event_export_ics'),
     path('events/new/', views.event_create, name='event_create'),
-    path('events/<int:pk>/', views.EventDetailView.as_view(), name='event_detail'),
+    path('events/<int:pk>/', read_views.EventDetailView.as_view(), name='event_detail'),
     path('events/<int:pk>/edit/', views.event_edit, name='event_edit'),
     path('events/<int:pk>/delete/', views.event_delete, name='event_delete'),
+    path('events/<int:pk>/skip/<str:day>/', views.occurrence_skip, name='occurrence_skip'),
+    path('events/<int:pk>/rsvp/', views.event_rsvp, name='event_rsvp'),
+    path('rsvp/<uuid:token>/cancel/', views.rsvp_cancel, name='rsvp_cancel'),
 ]
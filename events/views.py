@@ -1,81 +1,106 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
 from django.views.generic import DetailView
+from datetime import date
 
 from categories.models import Category
 from venues.models import Venue
-from .forms import EventForm, EventEditForm
-from .models import Event
-
-
+from .cache import cached_page_data
+from .conditional import conditional_page, event_validator, tables_validator
+from .exports import iter_export_rows, stream_csv, stream_ical
+from .facets import event_facets
+from .feed import upcoming_slice
+from .filters import filter_events
+from .forms import EventForm, EventEditForm, RsvpForm
+from .fragments import event_cards
+from .models import Event, RecurrenceException, Rsvp
+from .pagination import EVENT_SORT_KEYS, keyset_ordering, paginate_keyset
+from .recurrence import as_occurrence, merge_for, merge_upcoming, series_context, upcoming_series
+from .rsvp import RsvpClosed, cancel_rsvp, rsvp, waitlist_position
+
+
+@method_decorator(conditional_page(event_validator), name='get')
 class EventDetailView(DetailView):
     model = Event
+    queryset = Event.objects.select_related('venue', 'recurrence')
     template_name = 'events/detail.html'
     context_object_name = 'event'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['event_categories'] = self.object.categories.all()
+        context['rsvp_form'] = RsvpForm()
+        # ?on= shows one later date of a recurring event
+        context.update(series_context(self.object, self.request.GET.get('on')))
         return context
 
 
 def home(request):
-    upcoming_events = Event.objects.upcoming().select_related('venue')[:6]
-    some_venues = Venue.objects.order_by('name')[:4]
-    some_categories = Category.objects.order_by('name')[:6]
-
-    return render(request, 'events/home.html', {
-        'upcoming_events': upcoming_events,
-        'some_venues': some_venues,
-        'some_categories': some_categories,
-    })
-
+    def build():
+        return {
+            'upcoming_events': merge_upcoming(upcoming_slice(6), upcoming_series(), 6),
+            'some_venues': list(Venue.objects.order_by('name')[:4]),
+            'some_categories': list(Category.objects.order_by('name')[:6]),
+        }
 
-def event_list(request):
-    events = Event.objects.select_related('venue').prefetch_related('categories')
+    # "upcoming" moves with the calendar, hence vary on today's date
+    context = cached_page_data(
+        'home', ('events', 'venues', 'categories'), build, vary=date.today().isoformat()
+    )
+    return render(request, 'events/home.html', context)
 
-    search_query = request.GET.get('search', '').strip()
-    if search_query:
-        events = events.filter(
-            Q(title__icontains=search_query) | Q(description__icontains=search_query)
-        )
 
-    selected_venue_id = request.GET.get('venue', '')
-    if selected_venue_id:
-        events = events.filter(venue__id=selected_venue_id)
-
-    selected_category_id = request.GET.get('category', '')
-    if selected_category_id:
-        # distinct needed because the M2M join can produce duplicate rows
-        events = events.filter(categories__id=selected_category_id).distinct()
-
-    sort_by = request.GET.get('sort', 'date')
-    if sort_by == 'title':
-        events = events.order_by('title')
-    elif sort_by == 'price_low':
-        events = events.order_by('price')
-    elif sort_by == 'price_high':
-        events = events.order_by('-price')
-    else:
-        events = events.order_by('date')
+@conditional_page(tables_validator(Event, Venue, Category))
+def event_list(request):
+    # categories are only loaded for cards that aren't cached yet
+    events, filters = filter_events(request.GET, Event.objects.select_related('venue'))
+    sort_key = EVENT_SORT_KEYS[filters['sort_by']]
+    # by date, recurring events' later dates are merged in between the rows
+    page = paginate_keyset(events, sort_key, request.GET.get('cursor'), merge=merge_for(events, sort_key))
 
     return render(request, 'events/list.html', {
-        'events': events,
-        'all_venues': Venue.objects.order_by('name'),
-        'all_categories': Category.objects.order_by('name'),
-        'search_query': search_query,
-        'selected_venue_id': selected_venue_id,
-        'selected_category_id': selected_category_id,
-        'sort_by': sort_by,
+        'events': page.object_list,
+        'cards': event_cards(page.object_list),
+        'page': page,
+        'facets': event_facets(filters),
+        **filters,
     })
 
 
+def _export_rows(request):
+    # the whole filtered list in the same order as event_list, not just one page
+    events, filters = filter_events(request.GET)
+    return iter_export_rows(events.order_by(*keyset_ordering(EVENT_SORT_KEYS[filters['sort_by']])))
+
+
+def event_export_csv(request):
+    response = StreamingHttpResponse(stream_csv(_export_rows(request)), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="events.csv"'
+    return response
+
+
+def event_export_ics(request):
+    rows = _export_rows(request)
+    body = stream_ical(
+        rows,
+        domain=request.get_host().split(':')[0],
+        url_for=lambda row: request.build_absolute_uri(reverse('event_detail', kwargs={'pk': row['id']})),
+    )
+    response = StreamingHttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="events.ics"'
+    return response
+
+
 def event_create(request):
     if request.method == 'POST':
         form = EventForm(request.POST)
-        if form.is_valid():
-            event = form.save()
+        event = form.save_booking() if form.is_valid() else None
+        if event is not None:
             messages.success(request, f'Event "{event.title}" was created successfully!')
             return redirect('event_list')
         messages.error(request, 'Please fix the errors below.')
@@ -90,8 +115,7 @@ def event_edit(request, pk):
 
     if request.method == 'POST':
         form = EventEditForm(request.POST, instance=event)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and form.save_booking() is not None:
             messages.success(request, f'"{event.title}" was updated.')
             return redirect('event_detail', pk=event.pk)
         messages.error(request, 'There are some errors, please check the form.')
@@ -117,5 +141,72 @@ def event_delete(request, pk):
     return render(request, 'events/delete.html', {'event': event})
 
 
+def occurrence_skip(request, pk, day):
+    # cancels one later date of a recurring event, stored as an exception
+    event = get_object_or_404(Event.objects.select_related('recurrence'), pk=pk)
+    rule = getattr(event, 'recurrence', None)
+    try:
+        original = date.fromisoformat(day)
+    except ValueError:
+        raise Http404
+    if rule is None or original == event.date or not rule.occurs_on(event.date, original):
+        raise Http404
+
+    if request.method == 'POST':
+        RecurrenceException.objects.update_or_create(
+            recurrence=rule, original_date=original, defaults={'cancelled': True}
+        )
+        messages.success(request, f'"{event.title}" on {original:%a %d %b} was cancelled.')
+        return redirect(event)
+
+    moved = rule.exceptions.filter(original_date=original).first()
+    occurrence = as_occurrence(event, (moved.date or original) if moved else original, original_date=original)
+    return render(request, 'events/occurrence_skip.html', {'event': event, 'occurrence': occurrence})
+
+
+@require_POST
+def event_rsvp(request, pk):
+    event = get_object_or_404(Event, pk=pk)
+    form = RsvpForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, 'Please give your name and a valid email address.')
+        return redirect(event)
+
+    try:
+        entry, created = rsvp(event, form.cleaned_data['name'], form.cleaned_data['email'])
+    except RsvpClosed as e:
+        messages.error(request, str(e))
+        return redirect(event)
+
+    if not created:
+        # no cancel link here: it would hand it to anyone who knows the address
+        messages.info(request, "That email address has already RSVP'd to this event.")
+        return redirect(event)
+
+    # no accounts, so the cancel link is the only way back to the RSVP
+    if entry.status == Rsvp.GOING:
+        text = f'See you at "{event.title}"!'
+    else:
+        text = f'"{event.title}" is full, so you are number {waitlist_position(entry)} on the waitlist.'
+    cancel_url = reverse('rsvp_cancel', kwargs={'token': entry.token})
+    messages.success(request, format_html('{} <a href="{}">Keep this link to cancel.</a>', text, cancel_url))
+    return redirect(event)
+
+
+def rsvp_cancel(request, token):
+    entry = get_object_or_404(Rsvp.objects.select_related('event'), token=token)
+
+    if request.method == 'POST':
+        if cancel_rsvp(entry):
+            messages.success(request, f'Your RSVP to "{entry.event.title}" was cancelled.')
+        return redirect(entry.event)
+
+    return render(request, 'events/rsvp_cancel.html', {
+        'rsvp': entry,
+        'event': entry.event,
+        'position': waitlist_position(entry),
+    })
+
+
 def handler_404(request, exception):
     return render(request, '404.html', status=404)
@@ -0,0 +1,90 @@
+// Search-as-you-type for the <select data-autocomplete-url> widgets from
+// events/autocomplete.py. The page only contains the chosen options; this
+// asks the endpoint for matches and adds the picked ones to the select, so
+// the form still submits plain ids.
+(function () {
+  function debounce(fn, wait) {
+    let timer;
+    return function (...args) {
+      clearTimeout(timer);
+      timer = setTimeout(() => fn.apply(this, args), wait);
+    };
+  }
+
+  function setup(select) {
+    const input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control form-control-sm mb-1';
+    input.placeholder = select.multiple ? 'Type to add...' : 'Type to search...';
+    input.autocomplete = 'off';
+
+    const results = document.createElement('div');
+    results.className = 'list-group mb-1';
+
+    // chosen categories as removable badges instead of a multi-select box
+    const chosen = document.createElement('div');
+    chosen.className = 'd-flex flex-wrap gap-1 mb-1';
+
+    select.before(input, results);
+    if (select.multiple) {
+      select.hidden = true;
+      select.after(chosen);
+    }
+
+    function renderChosen() {
+      if (!select.multiple) return;
+      chosen.replaceChildren();
+      for (const option of select.selectedOptions) {
+        const badge = document.createElement('button');
+        badge.type = 'button';
+        badge.className = 'btn btn-sm btn-secondary';
+        badge.textContent = option.text + ' ×';
+        badge.addEventListener('click', () => {
+          option.remove();
+          renderChosen();
+        });
+        chosen.append(badge);
+      }
+    }
+
+    function pick(item) {
+      let option = Array.from(select.options).find((o) => o.value === String(item.id));
+      if (!option) {
+        option = new Option(item.label, item.id);
+        select.add(option);
+      }
+      if (!select.multiple) {
+        // keep the empty choice and the new pick only
+        Array.from(select.options).forEach((o) => { if (o.value && o !== option) o.remove(); });
+      }
+      option.selected = true;
+      input.value = '';
+      results.replaceChildren();
+      renderChosen();
+    }
+
+    const search = debounce(async () => {
+      const url = new URL(select.dataset.autocompleteUrl, window.location.origin);
+      url.searchParams.set('q', input.value);
+      const response = await fetch(url, { headers: { Accept: 'application/json' } });
+      if (!response.ok) return;
+      const data = await response.json();
+      results.replaceChildren(...data.results.map((item) => {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'list-group-item list-group-item-action py-1';
+        button.textContent = item.label;
+        button.addEventListener('click', () => pick(item));
+        return button;
+      }));
+    }, 200);
+
+    input.addEventListener('input', () => {
+      if (input.value.trim()) search();
+      else results.replaceChildren();
+    });
+    renderChosen();
+  }
+
+  document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+})();
@@ -0,0 +1,119 @@
+from datetime import date, timedelta
+
+from django.db.models.functions import Lower
+
+from events.api import (
+    ApiError, api_view, detail_payload, json_response, keyset_payload, parse_date, parse_fields,
+)
+from events.autocomplete import parse_autocomplete, prefix_matches
+from events.conditional import conditional_page, tables_validator
+from events.models import Event
+from .availability import MAX_RANGE_DAYS, free_venues, occupancy
+from .models import Venue
+
+
+VENUE_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'address': 'address',
+    'city': 'city',
+    'capacity': 'capacity',
+    'phone': 'phone',
+    'email': 'email',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+CALENDAR_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'city': 'city',
+    'capacity': 'capacity',
+    'booked': None,
+}
+
+CALENDAR_FORMATS = ('dates', 'bitmap')
+
+
+def _by_city(request, venues):
+    city = request.GET.get('city', '').strip()
+    if city:
+        venues = venues.filter(city__iexact=city)
+    return venues
+
+
+@conditional_page(tables_validator(Venue))
+@api_view
+def venue_list(request):
+    fields = parse_fields(request, VENUE_FIELDS)
+    venues = _by_city(request, Venue.objects.all())
+    return json_response(keyset_payload(request, venues, ('name', False), fields, VENUE_FIELDS))
+
+
+@api_view
+def venue_autocomplete(request):
+    # ?q=<prefix of the name or the city>, for the event form's venue picker
+    prefix, limit = parse_autocomplete(request)
+    venues = prefix_matches(Venue.objects.all(), [Lower('name'), Lower('city')], prefix, limit)
+    return json_response({'results': [
+        {'id': v.pk, 'label': str(v), 'name': v.name, 'city': v.city, 'capacity': v.capacity}
+        for v in venues
+    ]})
+
+
+@conditional_page(tables_validator(Venue, Event))
+@api_view
+def venue_calendar(request):
+    # ?start=&end= (today and 30 days on by default), city=, venue=1,2,3 and
+    # format=dates (booked days as a list) or bitmap ('0' free / '1' booked
+    # per day from start). The whole page's bookings come from one query
+    start = parse_date(request, 'start', date.today())
+    end = parse_date(request, 'end', start + timedelta(days=30))
+    if end < start:
+        raise ApiError('end is before start')
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ApiError(f'at most {MAX_RANGE_DAYS} days at a time')
+    output = request.GET.get('format', 'dates')
+    if output not in CALENDAR_FORMATS:
+        raise ApiError(f'format must be one of: {", ".join(CALENDAR_FORMATS)}')
+    fields = parse_fields(request, CALENDAR_FIELDS)
+
+    venues = _by_city(request, Venue.objects.all())
+    raw_ids = request.GET.get('venue', '')
+    if raw_ids:
+        ids = [part.strip() for part in raw_ids.split(',')]
+        if not all(part.isdigit() for part in ids):
+            raise ApiError('venue must be a comma separated list of ids')
+        venues = venues.filter(pk__in=ids)
+
+    def fill_booked(rows, fields):
+        if 'booked' not in fields:
+            return
+        taken = occupancy(start, end, [row['id'] for row in rows])
+        for row in rows:
+            row['booked'] = taken.bitstring(row['id']) if output == 'bitmap' else taken.booked[row['id']]
+
+    payload = keyset_payload(request, venues, ('name', False), fields, CALENDAR_FIELDS, fill=fill_booked)
+    return json_response({'start': start, 'end': end, 'format': output, **payload})
+
+
+@conditional_page(tables_validator(Venue, Event))
+@api_view
+def venue_free(request):
+    # ?date=YYYY-MM-DD&capacity=N: venues with nothing booked that day and
+    # room for N people, smallest first
+    day = parse_date(request, 'date')
+    capacity = request.GET.get('capacity', '0')
+    if not capacity.isdigit():
+        raise ApiError('capacity must be a whole number')
+    fields = parse_fields(request, VENUE_FIELDS)
+    venues = _by_city(request, free_venues(day, int(capacity)))
+    payload = keyset_payload(request, venues, ('capacity', False), fields, VENUE_FIELDS)
+    return json_response({'date': day, 'capacity': int(capacity), **payload})
+
+
+@conditional_page(tables_validator(Venue))
+@api_view
+def venue_detail(request, pk):
+    fields = parse_fields(request, VENUE_FIELDS)
+    return json_response(detail_payload(Venue.objects.all(), pk, fields, VENUE_FIELDS))
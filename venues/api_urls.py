@@ -0,0 +1,12 @@
+# venues/api_urls.py
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path('', api.venue_list, name='api_venue_list'),
+    path('autocomplete/', api.venue_autocomplete, name='api_venue_autocomplete'),
+    path('calendar/', api.venue_calendar, name='api_venue_calendar'),
+    path('free/', api.venue_free, name='api_venue_free'),
+    path('<int:pk>/', api.venue_detail, name='api_venue_detail'),
+]
@@ -4,3 +4,5 @@ class VenuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'venues'
 
+    def ready(self):
+        import venues.signals
@@ -0,0 +1,42 @@
+import asyncio
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+
+from events.conditional import conditional_page, venue_validator
+from events.pagination import paginate_keyset
+from events.recurrence import merge_occurrences, merge_upcoming, running, with_rules
+from .models import Venue
+from .views import PAST_EVENTS_PER_PAGE, UPCOMING_EVENTS_SHOWN
+
+
+@conditional_page(venue_validator)
+async def venue_detail(request, pk):
+    venue = await aget_object_or_404(Venue, pk=pk)
+    today = date.today()
+
+    # series dates are merged in like the sync view does; the merges read
+    # the series lazily, so each runs whole in one sync_to_async hop
+    past_series = with_rules(venue.events.filter(date__lt=today))
+    upcoming_events, past_page = await asyncio.gather(
+        sync_to_async(merge_upcoming)(
+            venue.get_upcoming_events()[:UPCOMING_EVENTS_SHOWN],
+            with_rules(venue.events.filter(running(today))),
+            UPCOMING_EVENTS_SHOWN,
+        ),
+        sync_to_async(paginate_keyset)(
+            venue.get_past_events(),
+            ('date', True),
+            request.GET.get('past'),
+            per_page=PAST_EVENTS_PER_PAGE,
+            merge=lambda after, reverse: merge_occurrences(past_series, after, reverse, end=today - timedelta(days=1)),
+        ),
+    )
+
+    return render(request, 'venues/detail.html', {
+        'venue': venue,
+        'upcoming_events': upcoming_events,
+        'past_events': past_page.object_list,
+        'past_page': past_page,
+    })
@@ -0,0 +1,151 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+from django.db.models import Q
+
+from events.models import Event
+from events.recurrence import horizon, occurrence_dates, occurrences, running, with_rules
+from .models import Venue
+
+
+# what counts as taking a venue for the day: the same condition as the
+# unique_active_event_per_venue_date constraint, so on Postgres the
+# queries below can be answered from that constraint's partial index
+HOLDS_SLOT = ~Q(status='cancelled')
+
+# the longest range occupancy() is asked for by the calendar endpoint
+MAX_RANGE_DAYS = 366
+
+
+def booked_slots(start, end, venue_ids=None, exclude_event_id=None):
+    """Events holding a venue on some day from `start` to `end` (inclusive)."""
+    events = Event.objects.filter(HOLDS_SLOT, venue__isnull=False, date__gte=start, date__lte=end)
+    if venue_ids is not None:
+        events = events.filter(venue_id__in=venue_ids)
+    if exclude_event_id is not None:
+        # the event being edited doesn't clash with itself
+        events = events.exclude(pk=exclude_event_id)
+    return events
+
+
+def series_slots(start, end, venue_ids=None, exclude_event_id=None):
+    """
+    (venue_id, day) for each later date of a recurring event holding a
+    venue from `start` to `end`. Those dates have no rows, so the database
+    constraint can't see them; they're worked out from the rules instead.
+    """
+    series = Event.objects.filter(HOLDS_SLOT, running(start), venue__isnull=False, date__lt=end)
+    if venue_ids is not None:
+        series = series.filter(venue_id__in=venue_ids)
+    if exclude_event_id is not None:
+        series = series.exclude(pk=exclude_event_id)
+    for event in with_rules(series):
+        for occurrence in occurrences(event, start, end):
+            yield event.venue_id, occurrence.date
+
+
+class Occupancy:
+    """
+    Which days from `start` to `end` each venue is booked, as a sorted list
+    of dates per venue id. Venues that were asked about and have nothing
+    booked map to an empty list.
+    """
+
+    def __init__(self, start, end, booked):
+        self.start = start
+        self.end = end
+        self.booked = booked
+
+    @property
+    def days(self):
+        return (self.end - self.start).days + 1
+
+    def is_free(self, venue_id, day):
+        dates = self.booked.get(venue_id, [])
+        i = bisect_left(dates, day)
+        return i == len(dates) or dates[i] != day
+
+    def bitmap(self, venue_id):
+        # bit n is set when start + n days is booked
+        bits = 0
+        for day in self.booked.get(venue_id, []):
+            bits |= 1 << (day - self.start).days
+        return bits
+
+    def bitstring(self, venue_id):
+        # '0' free / '1' booked per day, first day first
+        return format(self.bitmap(venue_id), f'0{self.days}b')[::-1]
+
+    def free_dates(self, venue_id):
+        bits = self.bitmap(venue_id)
+        for n in range(self.days):
+            if not bits >> n & 1:
+                yield self.start + timedelta(days=n)
+
+
+def occupancy(start, end, venue_ids=None, exclude_event_id=None):
+    """
+    The Occupancy of `venue_ids` (every venue with a booking when None)
+    from `start` to `end`, in one query: the events dated in the range
+    and the series running into it, rules joined in. The later dates of
+    those series come from the rules; their cancelled and moved dates are
+    one more query, only when there are any series.
+    """
+    booked = {venue_id: [] for venue_id in venue_ids} if venue_ids is not None else {}
+    events = Event.objects.filter(HOLDS_SLOT, venue__isnull=False).filter(
+        Q(date__gte=start, date__lte=end) | (running(start) & Q(recurrence__isnull=False, date__lt=end))
+    )
+    if venue_ids is not None:
+        events = events.filter(venue_id__in=venue_ids)
+    if exclude_event_id is not None:
+        events = events.exclude(pk=exclude_event_id)
+    events = (
+        events.select_related('recurrence').only('venue', 'date', 'recurrence')
+        .prefetch_related('recurrence__exceptions')
+        .order_by('venue_id', 'date')
+    )
+    for event in events:
+        dates = booked.setdefault(event.venue_id, [])
+        if start <= event.date <= end:
+            insort(dates, event.date)
+        rule = getattr(event, 'recurrence', None)
+        if rule is not None:
+            for day, _, _ in occurrence_dates(rule, event.date, rule.exceptions.all(), start, end):
+                insort(dates, day)
+    return Occupancy(start, end, booked)
+
+
+def free_venues(day, min_capacity=0):
+    """Venues with room for `min_capacity` people and nothing booked on `day`, as one query."""
+    taken = booked_slots(day, day).values('venue_id')
+    by_series = {venue_id for venue_id, _ in series_slots(day, day)}
+    return Venue.objects.filter(capacity__gte=min_capacity).exclude(pk__in=taken).exclude(pk__in=by_series)
+
+
+def next_free_dates(venue_id, after, count=3, window=60, exclude_event_id=None):
+    """Up to `count` days from `after` on (but not in the past) when the venue is free."""
+    start = max(after, date.today())
+    free = occupancy(start, start + timedelta(days=window), [venue_id], exclude_event_id).free_dates(venue_id)
+    return [day for day, _ in zip(free, range(count))]
+
+
+def clashing_dates(venue_id, days, exclude_event_id=None):
+    """The days among `days` (sorted) on which the venue is already booked."""
+    if not days:
+        return []
+    taken = occupancy(days[0], days[-1], [venue_id], exclude_event_id)
+    return [day for day in days if not taken.is_free(venue_id, day)]
+
+
+def series_days(rule, first, exceptions=()):
+    """
+    The later dates of a (possibly unsaved) series starting on `first`:
+    all of them up to the rule's end, or up to the horizon when it has none.
+    """
+    end = rule.end_date(first) or horizon()
+    return [day for day, _, _ in occurrence_dates(rule, first, exceptions, end=end)]
+
+
+def series_clashes(venue_id, first, rule, exceptions=(), exclude_event_id=None):
+    """The series_days() the venue is already booked on."""
+    return clashing_dates(venue_id, series_days(rule, first, exceptions), exclude_event_id)
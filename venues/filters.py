@@ -0,0 +1,40 @@
+from events.cache import cached_page_data
+from .models import SIZE_BANDS, Venue
+
+
+SIZE_RANGES = {key: (lower, upper) for key, _, lower, upper in SIZE_BANDS}
+
+
+def venue_cities():
+    # the city dropdown; DISTINCT straight off the (city, name) index
+    return cached_page_data(
+        'venue_cities',
+        ('venues',),
+        lambda: list(Venue.objects.order_by('city').values_list('city', flat=True).distinct()),
+    )
+
+
+def filter_venues(params, queryset=None):
+    """
+    The venue list's city and size filters applied to `queryset`. Returns
+    the filtered queryset and the cleaned values for the template.
+    """
+    venues = Venue.objects.all() if queryset is None else queryset
+
+    selected_city = params.get('city', '').strip()
+    if selected_city:
+        venues = venues.filter(city=selected_city)
+
+    selected_size = params.get('size', '')
+    if selected_size in SIZE_RANGES:
+        lower, upper = SIZE_RANGES[selected_size]
+        venues = venues.filter(capacity__gte=lower)
+        if upper is not None:
+            venues = venues.filter(capacity__lt=upper)
+    else:
+        selected_size = ''
+
+    return venues, {
+        'selected_city': selected_city,
+        'selected_size': selected_size,
+    }
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0006_venue_city_name_idx_venue_capacity_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='venue',
+            name='capacity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
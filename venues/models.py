@@ -1,8 +1,24 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.urls import reverse
 from datetime import date
 
 
+# (key, label, lowest capacity, capacity the next band starts at)
+SIZE_BANDS = [
+    ('intimate', 'Intimate', 0, 50),
+    ('small', 'Small', 50, 200),
+    ('medium', 'Medium', 200, 1000),
+    ('large', 'Large', 1000, None),
+]
+
+
+def size_label(capacity):
+    for _, label, _, upper in SIZE_BANDS:
+        if upper is None or capacity < upper:
+            return label
+
+
 class Venue(models.Model):
     name = models.CharField(max_length=200)
     address = models.CharField(max_length=300)
@@ -11,9 +27,21 @@ class Venue(models.Model):
     phone = models.CharField(max_length=20, blank=True)
     email = models.EmailField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # MAX(updated_at) for the conditional GET validators, see events/conditional.py
+            models.Index(fields=['updated_at'], name='venue_updated_at_idx'),
+            # prefix search for the venue autocomplete, see events/autocomplete.py
+            models.Index(Lower('name'), name='venue_name_lower_idx'),
+            models.Index(Lower('city'), name='venue_city_lower_idx'),
+            # the venue list's city and size filters; (city, name) also
+            # gives one city's venues already in list order
+            models.Index(fields=['city', 'name'], name='venue_city_name_idx'),
+            models.Index(fields=['capacity'], name='venue_capacity_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.city})'
@@ -22,22 +50,16 @@ class Venue(models.Model):
         return reverse('venue_detail', kwargs={'pk': self.pk})
 
     def get_upcoming_events(self):
-        today = date.today()
-        upcoming = []
-        for event in self.events.all():
-            if event.date >= today:
-                upcoming.append(event)
-        return upcoming
+        return self.events.filter(date__gte=date.today()).order_by('date', 'time')
+
+    def get_past_events(self):
+        # newest first; the (venue, date) index on Event covers both of these
+        return self.events.filter(date__lt=date.today()).order_by('-date', '-pk')
 
     def is_available_on(self, check_date):
-        return not self.events.filter(date=check_date).exists()
+        # one venue, one day; for many of either use venues/availability.py
+        from .availability import occupancy
+        return occupancy(check_date, check_date, [self.pk]).is_free(self.pk, check_date)
 
     def get_size_label(self):
-        cap = self.capacity
-        if cap < 50:
-            return 'Intimate'
-        elif cap < 200:
-            return 'Small'
-        elif cap < 1000:
-            return 'Medium'
-        return 'Large'
+        return size_label(self.capacity)
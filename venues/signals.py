@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from events.cache import bump_generation
+from events.calendars import ALL_CALENDARS
+from events.models import ChangeLog
+from .models import Venue
+
+
+@receiver(post_save, sender=Venue)
+def invalidate_venue_pages(sender, **kwargs):
+    # a venue's name and address are in the LOCATION of its events, in
+    # category feeds too
+    bump_generation('venues', ALL_CALENDARS)
+
+
+@receiver(post_delete, sender=Venue)
+def invalidate_pages_after_venue_delete(sender, **kwargs):
+    # deleting a venue also nulls out venue on its events
+    bump_generation('venues', 'events', ALL_CALENDARS)
+
+
+@receiver(post_save, sender=Venue)
+def log_venue_change(sender, instance, **kwargs):
+    ChangeLog.objects.record(ChangeLog.VENUE, [instance.pk])
+
+
+@receiver(pre_delete, sender=Venue)
+def remember_events_before_venue_delete(sender, instance, **kwargs):
+    # SET_NULL updates them without a signal
+    instance._event_ids = list(instance.events.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Venue)
+def log_venue_delete(sender, instance, **kwargs):
+    ChangeLog.objects.record(ChangeLog.VENUE, [instance.pk], deleted=True)
+    ChangeLog.objects.record(ChangeLog.EVENT, getattr(instance, '_event_ids', []))
@@ -1,12 +1,16 @@
 # venues/urls.py
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
     path('', views.VenueListView.as_view(), name='venue_list'),
     path('new/', views.venue_create, name='venue_create'),
-    path('<int:pk>/', views.venue_detail, name='venue_detail'),
+    path('<int:pk>/', read_views.venue_detail, name='venue_detail'),
+    path('<int:pk>/events.ics', views.venue_calendar, name='venue_calendar'),
     path('<int:pk>/edit/', views.venue_edit, name='venue_edit'),
     path('<int:pk>/delete/', views.venue_delete, name='venue_delete'),
 ]
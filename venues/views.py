@@ -1,51 +1,96 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView
-
+from datetime import date, timedelta
+
+from events.calendars import calendar_events, calendar_feed
+from events.conditional import conditional_page, tables_validator, venue_validator
+from events.fragments import venue_cards
+from events.pagination import CountingPaginator, paginate_keyset
+from events.recurrence import merge_occurrences, merge_upcoming, running, with_rules
+from .filters import filter_venues, venue_cities
 from .forms import VenueForm, VenueEditForm
-from .models import Venue
+from .models import SIZE_BANDS, Venue
+
+
+VENUES_PER_PAGE = 24
 
 
+@method_decorator(conditional_page(tables_validator(Venue)), name='get')
 class VenueListView(ListView):
     model = Venue
     template_name = 'venues/list.html'
     context_object_name = 'venues'
+    paginate_by = VENUES_PER_PAGE
+    # the total is a COUNT, or the planner's estimate (LIST_COUNT_MODE)
+    paginator_class = CountingPaginator
 
     def get_queryset(self):
-        all_of_them = Venue.objects.all()
-        ordered = all_of_them.order_by('name')
-        return ordered
+        venues, self.filters = filter_venues(self.request.GET)
+        return venues.order_by('name', 'pk')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_venues_list = list(Venue.objects.all().order_by('name'))
-        context['total_count'] = len(all_venues_list)
+        paginator, page = context['paginator'], context['page_obj']
+        context.update(self.filters)
+        context['total_count'] = paginator.count
+        context['count_is_estimate'] = paginator.estimated
+        context['page_range'] = paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+        context['cities'] = venue_cities()
+        context['size_bands'] = SIZE_BANDS
+        context['cards'] = venue_cards(context['venues'])
         return context
 
 
-def venue_detail(request, pk):
-    venue = get_object_or_404(Venue, pk=pk)
-    all_venue_events = venue.events.all()
-    events_list = list(all_venue_events)
+PAST_EVENTS_PER_PAGE = 10
+# recurring events can fill the upcoming list on their own
+UPCOMING_EVENTS_SHOWN = 50
 
-    upcoming_ones = []
-    for ev in events_list:
-        if not ev.is_past():
-            upcoming_ones.append(ev)
 
-    past_ones = []
-    for ev in events_list:
-        if ev.is_past():
-            past_ones.append(ev)
+@conditional_page(venue_validator)
+def venue_detail(request, pk):
+    venue = get_object_or_404(Venue, pk=pk)
+    today = date.today()
+
+    # history can go back years, so it's shown a page at a time,
+    # newest first, with a "load older" cursor; series that started
+    # before today have their past dates merged in
+    past_series = with_rules(venue.events.filter(date__lt=today))
+    past_page = paginate_keyset(
+        venue.get_past_events(),
+        ('date', True),
+        request.GET.get('past'),
+        per_page=PAST_EVENTS_PER_PAGE,
+        merge=lambda after, reverse: merge_occurrences(past_series, after, reverse, end=today - timedelta(days=1)),
+    )
+
+    upcoming_events = merge_upcoming(
+        venue.get_upcoming_events()[:UPCOMING_EVENTS_SHOWN],
+        with_rules(venue.events.filter(running(today))),
+        UPCOMING_EVENTS_SHOWN,
+    )
 
     ctx = {
         'venue': venue,
-        'upcoming_events': upcoming_ones,
-        'past_events': past_ones,
+        'upcoming_events': upcoming_events,
+        'past_events': past_page.object_list,
+        'past_page': past_page,
     }
     return render(request, 'venues/detail.html', ctx)
 
 
+def venue_calendar(request, pk):
+    # an .ics feed of the venue's events for calendar apps to subscribe to
+    def build():
+        name = Venue.objects.filter(pk=pk).values_list('name', flat=True).first()
+        if name is None:
+            return None
+        return calendar_events().filter(venue_id=pk), f'LocalVibe: {name}'
+
+    return calendar_feed(request, 'venue', pk, build, f'venue-{pk}.ics')
+
+
 def venue_create(request):
     if request.method == 'POST':
         form = VenueForm(request.POST)